@@ -1,32 +1,249 @@
+import time
+_STARTUP_T0 = time.perf_counter() # Reference point for the startup timing report
 import os
 import sys
-import tkinter as tk
-from tkinter import messagebox, scrolledtext, StringVar
+import argparse
 import threading
-import time
-import webbrowser
 import logging
+import atexit
+import re
+import json
+import hashlib
+import mmap
+import codecs
+import csv
+import functools
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict, deque
+
+# Heavy libraries are bound lazily by the load_*_modules() functions below, so that
+# the window appears before they are imported and headless runs never import the GUI ones.
+keyboard = Controller = Key = KeyCode = None   # pynput: load_keyboard_modules()
+tk = messagebox = scrolledtext = filedialog = StringVar = None   # tkinter: load_gui_modules()
+pystray = Image = ImageDraw = ImageFont = None   # pystray/PIL: load_tray_modules(), on first minimize
+
+
+def load_keyboard_modules():
+    """Imports pynput into the module globals used for key injection and hotkeys."""
+    global keyboard, Controller, Key, KeyCode
+    if Controller is not None:
+        return
+    from pynput import keyboard
+    from pynput.keyboard import Controller, Key, KeyCode
+    CONTROL_CHAR_KEYS.update({'\n': Key.enter, '\r': Key.enter, '\t': Key.tab,
+                              KEY_DOWN_CHAR: Key.down, KEY_END_CHAR: Key.end, KEY_BACKSPACE_CHAR: Key.backspace,
+                              KEY_SELECT_HOME_CHAR: Key.home})
+    mark_startup("pynput loaded")
+
+
+def load_gui_modules():
+    """Imports tkinter into the module globals used by the GUI."""
+    global tk, messagebox, scrolledtext, filedialog, StringVar
+    import tkinter as tk
+    from tkinter import messagebox, scrolledtext, filedialog, StringVar
+    mark_startup("tkinter loaded")
+
+
+def load_tray_modules():
+    """Imports pystray and PIL into the module globals used by the system tray icon."""
+    global pystray, Image, ImageDraw, ImageFont
+    if pystray is not None:
+        return
+    import pystray
+    from PIL import Image, ImageDraw, ImageFont
+
+
+# --- Startup Timing ---
+_startup_marks = []
+
+
+def mark_startup(label):
+    """Records the time since module import started under `label` (only during startup)."""
+    if _startup_marks and _startup_marks[-1][0] == "startup complete":
+        return
+    _startup_marks.append((label, (time.perf_counter() - _STARTUP_T0) * 1000))
+
 
-# Libraries for Autotyper functionality
-from pynput import keyboard
-from pynput.keyboard import Controller, Key
-import pystray
-from PIL import Image, ImageDraw, ImageFont
+def startup_report():
+    return ", ".join(f"{label} at {ms:.1f}ms" for label, ms in _startup_marks)
 
 # --- Setup Logging ---
-logging.basicConfig(
-    filename='robokeybo_log.txt',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
-logging.info("Application started.")
+LOG_FILENAME = 'robokeybo_log.txt'
+LOG_MAX_BYTES = 1024 * 1024 # The log file is rotated at this size
+LOG_BACKUP_COUNT = 3 # Rotated files kept next to it (robokeybo_log.txt.1 ... .3)
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+LOG_LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR')
+DEFAULT_LOG_LEVEL = os.environ.get('ROBOKEYBO_LOG_LEVEL', 'INFO').upper()
+keystroke_log = logging.getLogger('robokeybo.keys') # Per-batch keystroke trace, see set_keystroke_trace()
+_keystroke_trace = False # Read once per batch by the typing loop
+_log_handler = None # The rotating file (or stderr) handler that queue listeners write to
+log_path = None
+
+
+def setup_logging(level=DEFAULT_LOG_LEVEL, keystroke_trace=False):
+    """Routes all logging through a queue to a background writer thread.
+
+    Log calls only enqueue the record; formatting and disk I/O happen on the writer,
+    which appends to a size-rotated file in user_data_dir().
+    """
+    global _log_handler, log_path
+    import logging.handlers
+    import queue
+    error = None
+    try:
+        log_path = os.path.join(user_data_dir(), LOG_FILENAME)
+        _log_handler = logging.handlers.RotatingFileHandler(log_path, maxBytes=LOG_MAX_BYTES,
+                                                            backupCount=LOG_BACKUP_COUNT, encoding='utf-8')
+    except OSError as e:
+        error, log_path = e, None
+        _log_handler = logging.StreamHandler(sys.stderr)
+    _log_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    log_queue = queue.SimpleQueue()
+    log_to_queue(log_queue, local=True)
+    atexit.register(start_log_listener(log_queue).stop) # stop() writes out what is still queued
+    set_log_level(level)
+    set_keystroke_trace(keystroke_trace)
+    if error is not None:
+        logging.warning(f"Cannot write the log file, logging to stderr: {error}")
+
+
+def start_log_listener(log_queue):
+    """Starts a writer thread for records arriving on `log_queue`. Returns the QueueListener."""
+    import logging.handlers
+    listener = logging.handlers.QueueListener(log_queue, _log_handler)
+    listener.start()
+    return listener
+
+
+def log_to_queue(log_queue, local=False):
+    """Replaces the root logger's handlers with one that only puts records on `log_queue`.
+
+    Records for a `local` (same-process) queue are passed on unformatted, so even message
+    formatting happens on the writer thread; other queues get picklable, pre-formatted records.
+    """
+    import logging.handlers
+
+    class LocalQueueHandler(logging.handlers.QueueHandler):
+        def prepare(self, record):
+            return record
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler((LocalQueueHandler if local else logging.handlers.QueueHandler)(log_queue))
+
+
+def set_log_level(level):
+    logging.getLogger().setLevel(level if level in LOG_LEVELS else 'INFO')
+
+
+def set_keystroke_trace(enabled):
+    """Turns the per-batch keystroke trace on or off, also mid-session and whatever the log level."""
+    global _keystroke_trace
+    keystroke_log.setLevel(logging.DEBUG if enabled else logging.NOTSET)
+    _keystroke_trace = bool(enabled)
+
+# --- Timeline Tracing ---
+TRACE_MAX_EVENTS = 1000000 # Oldest events are dropped past this, bounding memory on long runs
+
+
+class TimelineTracer:
+    """Collects timestamped spans for a Chrome trace file (chrome://tracing or ui.perfetto.dev).
+
+    Recording a span is one tuple appended to a bounded deque, from any thread; the JSON is
+    only built by write(). Timestamps are raw perf_counter() values, which are system-wide,
+    so spans sent over from the typing process line up with the app's.
+    """
+
+    def __init__(self, max_events=TRACE_MAX_EVENTS):
+        self.pid = os.getpid()
+        self.events = deque(maxlen=max_events) # (pid, tid, name, category, start, end or None, args)
+        self.thread_names = {} # (pid, thread ident) -> (native thread id, thread name)
+
+    def complete(self, name, category, start, end=None, args=None):
+        """Records a span from `start` to `end` (default: now), both perf_counter() values.
+
+        `args` is a dict or, on hot paths, a tuple of (key, value) pairs: tuples of plain
+        values drop out of garbage collection, so a long trace does not slow collections down.
+        """
+        self._record(name, category, start, time.perf_counter() if end is None else end, args)
+
+    def instant(self, name, category, args=None):
+        """Records a point in time, e.g. a tray icon state change."""
+        self._record(name, category, time.perf_counter(), None, args)
+
+    def _record(self, name, category, start, end, args):
+        tid = threading.get_ident() # Cheaper than the native id, which is looked up once per thread
+        if (self.pid, tid) not in self.thread_names:
+            self.thread_names[self.pid, tid] = (threading.get_native_id(), threading.current_thread().name)
+        self.events.append((self.pid, tid, name, category, start, end, args))
+
+    def drain(self):
+        """Removes and returns (events, thread_names), to be merge()d by another process's tracer."""
+        events = []
+        while self.events:
+            events.append(self.events.popleft())
+        return events, dict(self.thread_names)
+
+    def merge(self, events, thread_names):
+        self.events.extend(events)
+        self.thread_names.update(thread_names)
+
+    def write(self, path):
+        trace = [{'ph': 'M', 'name': 'process_name', 'pid': pid, 'tid': 0,
+                  'args': {'name': "RoboKeybo" if pid == self.pid else "RoboKeybo typing"}}
+                 for pid in {pid for pid, _ in self.thread_names}]
+        trace += [{'ph': 'M', 'name': 'thread_name', 'pid': pid, 'tid': native_id, 'args': {'name': name}}
+                  for (pid, _), (native_id, name) in self.thread_names.items()]
+        for pid, tid, name, category, start, end, args in list(self.events):
+            event = {'name': name, 'cat': category, 'pid': pid, 'tid': self.thread_names[pid, tid][0],
+                     'ts': round(start * 1e6, 3)}
+            if end is None:
+                event.update(ph='i', s='t')
+            else:
+                event.update(ph='X', dur=round((end - start) * 1e6, 3))
+            if args:
+                event['args'] = dict(args)
+            trace.append(event)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, f)
+        logging.info(f"Wrote {len(trace)} trace events to {path}.")
+
+
+tracer = None # The active TimelineTracer; None (the default) disables tracing everywhere
+
+
+def start_tracing(path=None):
+    """Enables tracing for the rest of the run; the trace is written to `path` at exit."""
+    global tracer
+    tracer = TimelineTracer()
+    if path is not None:
+        def write_trace():
+            try:
+                tracer.write(path)
+            except OSError as e:
+                logging.error(f"Failed to write trace {path}: {e}")
+        atexit.register(write_trace)
+
+
+def traced(name, category, func, *args):
+    """Calls func(*args), recording it as a span when tracing is enabled."""
+    if tracer is None:
+        return func(*args)
+    start = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        tracer.complete(name, category, start)
+
 
 # --- Global Exception Handler ---
 def custom_exception_handler(exc_type, exc_value, exc_traceback):
     logging.exception("An unhandled exception occurred:", exc_info=(exc_type, exc_value, exc_traceback))
     if is_tkinter_running():
         messagebox.showerror("Critical Application Error",
-                             "An unexpected error occurred. Please check 'robokeybo_log.txt' for details.\n"
+                             f"An unexpected error occurred. Please check '{log_path or LOG_FILENAME}' for details.\n"
                              f"Error: {exc_value}")
     sys.__excepthook__(exc_type, exc_value, exc_traceback)
 
@@ -34,6 +251,8 @@ sys.excepthook = custom_exception_handler
 
 def is_tkinter_running():
     """Checks if Tkinter mainloop is active."""
+    if tk is None:
+        return False
     try:
         # A simple check to see if the main window exists and is valid
         if tk._default_root:
@@ -53,22 +272,2179 @@ def resource_path(relative_path):
     except Exception:
         base_path = os.path.abspath(".")
 
-    return os.path.join(base_path, relative_path)
+    return os.path.join(base_path, relative_path)
+
+
+def user_data_dir():
+    """Per-user directory for RoboKeybo's state files, created on first use."""
+    if sys.platform == 'win32':
+        path = os.path.join(os.environ.get('APPDATA') or os.path.expanduser('~'), 'RoboKeybo')
+    elif sys.platform == 'darwin':
+        path = os.path.expanduser('~/Library/Application Support/RoboKeybo')
+    else:
+        path = os.path.join(os.environ.get('XDG_STATE_HOME') or os.path.expanduser('~/.local/state'), 'robokeybo')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+
+
+# --- Configuration ---
+DEFAULT_WPM = 120
+MIN_WPM = 10
+MAX_WPM = 3000
+DEFAULT_HOTKEY_STR = 'z'
+DEFAULT_KEYBOARD_BACKEND = 'pynput'
+COUNTDOWN_SECONDS = 3
+RESUME_COUNTDOWN_SECONDS = 1 # Resuming a paused session needs less time to focus the target
+CHECKPOINT_INTERVAL_CHARS = 500  # Progress is checkpointed to disk every this many characters
+CHECKPOINT_FILENAME = 'checkpoint.json'
+SESSION_METRICS_FILENAME = 'sessions.jsonl' # One JSON record per finished session
+SNIPPETS_FILENAME = 'snippets.db' # The snippet library (SQLite)
+SNIPPET_CACHE_ENTRIES = 16   # Snippet bodies (with compiled plans) kept in memory...
+SNIPPET_CACHE_CHARS = 1000000 # ...up to this many characters in total
+ALL_SNIPPETS_TAG = "All tags" # Tag filter entry that shows every snippet
+INJECTION_LATENCY_BUCKETS_US = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000) # Histogram upper bounds
+MMAP_WINDOW_BYTES = 65536    # Bytes decoded from a memory-mapped text file at a time
+PROGRESS_INTERVAL_S = 0.1    # Minimum time between progress callbacks from the typing engine
+STREAM_BLOCK_CHARS = 65536   # Characters read from a text stream per compiled block
+TRAY_STOP_TIMEOUT_S = 1.0    # Longest wait for the tray thread at exit
+PROCESS_STOP_TIMEOUT_S = 1.0 # Longest wait for the typing process at exit before it is terminated
+ENGINE_STOP_TIMEOUT_S = 2.0  # Longest wait for the typing thread at exit before its backend is released
+UI_FRAME_INTERVAL_MS = 33    # The UI channel is drained at ~30 frames per second
+SYNTHETIC_ECHO_TIMEOUT_S = 0.5   # An injected hotkey press not seen by the listener within this is forgotten
+LLKHF_INJECTED = 0x10        # Windows low-level keyboard hook flag for injected events
+CHARS_PER_WORD = 5           # Standard WPM definition: one "word" is five characters
+SPIN_THRESHOLD_S = 0.002     # The last stretch before a deadline is spun instead of slept
+SLEEP_SLICE_S = 0.05         # Longest single sleep, so a stop request is noticed quickly
+MAX_LAG_S = 0.25             # Falling further behind than this rebases the schedule instead of bursting
+DEFAULT_BURST_SIZE = 32      # Characters injected per batched call in burst mode
+MIN_BURST_SIZE = 2
+MAX_BURST_SIZE = 1024
+CLIPBOARD_MIN_SEGMENT = 256          # Pasteable runs shorter than this are typed instead
+CLIPBOARD_SEGMENT = 16384            # Starting paste size; tuned per segment when the clipboard sees the target read it
+CLIPBOARD_MAX_SEGMENT = 262144
+CLIPBOARD_TARGET_READ_S = 0.25       # Time from paste chord to the target having read the segment that the tuner aims for
+CLIPBOARD_READ_TIMEOUT_S = 3.0       # A paste not read by then is treated as lost and the session stops before it
+CLIPBOARD_SETTLE_BASE_S = 0.05       # Time the target gets to read the clipboard after a paste
+CLIPBOARD_SETTLE_PER_KB_S = 0.002
+PLAN_CACHE_SIZE = 8                  # Compiled keystroke plans kept for re-armed texts
+LARGE_TEXT_CHARS = 200000            # Pastes longer than this open as a read-only, virtualized preview
+PREVIEW_LINES = 200                  # Lines rendered into the preview at a time
+PREVIEW_MAX_LINE_CHARS = 2000        # Longer lines are cut short in the preview (never when typing)
+BENCHMARK_WPM_TARGETS = (120, 600, 1200, 3000) # Rates the pacing benchmark measures jitter at
+BENCHMARK_THROUGHPUT_CHARS = 200000  # Text length for the unthrottled throughput benchmark
+BENCHMARK_REPEATS = 20               # Samples per latency benchmark
+DEFAULT_TAB_WIDTH = 4                # Spaces per tab for the indentation transforms
+# Transform chains per kind of editor target; each chain models one editor's behaviour on Enter
+EDITOR_TARGETS = {
+    'none': (),
+    'keep-indent': ('normalize-newlines', 'keep-indent'), # Repeats the indentation (Notepad++, gedit, Kate)
+    'code': ('normalize-newlines', 'smart-indent', 'skip-pairs'), # Indents blocks, closes brackets (VS Code, JetBrains, Sublime)
+}
+DEFAULT_EDITOR_TARGET = 'none'
+# Private-use characters that transforms put in the text to have cursor keys pressed
+KEY_DOWN_CHAR = '\ue000'
+KEY_END_CHAR = '\ue001'
+KEY_BACKSPACE_CHAR = '\ue002'
+KEY_SELECT_HOME_CHAR = '\ue003'     # Shift+Home
+SHIFTED_CONTROL_CHARS = frozenset({KEY_SELECT_HOME_CHAR}) # Pressed with Shift held
+# Keys that can separate the fields and the records of a CSV form fill
+FORM_FILL_KEYS = {'tab': '\t', 'enter': '\n', 'down': KEY_DOWN_CHAR, 'space': ' ', 'none': ''}
+DEFAULT_FIELD_KEY = 'tab'
+DEFAULT_RECORD_KEY = 'enter'
+DEFAULT_RECORD_DELAY_S = 1.0         # Pause after each record, e.g. for the form to submit and reset
+MAX_RECORD_DELAY_S = 60
+# Characters that targets commonly drop or rewrite when pasted; these are always typed as keystrokes.
+PASTE_FILTERED_CHARS_RE = re.compile(r'([\t\x00-\x08\x0b-\x1f\x7f\ue000-\ue003]+)')
+
+
+# --- Keystroke Pacing ---
+def wait_until(deadline, stop_event=None):
+    """Blocks until time.perf_counter() reaches `deadline`. Returns True if `stop_event` was set.
+
+    Coarse waiting is done with sleep; the final SPIN_THRESHOLD_S is spun so that
+    OS timer granularity does not turn into sleep overshoot.
+    """
+    while True:
+        if stop_event is not None and stop_event.is_set():
+            return True
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return False
+        if remaining > SPIN_THRESHOLD_S:
+            time.sleep(min(remaining - SPIN_THRESHOLD_S, SLEEP_SLICE_S))
+        else:
+            while time.perf_counter() < deadline:
+                time.sleep(0) # Yield the GIL while spinning
+            return False
+
+
+class KeystrokePacer:
+    """Schedules keystrokes against absolute monotonic deadlines.
+
+    Deadlines are computed from the session start (start + n * interval), so injection
+    time and sleep overshoot are absorbed by the next wait instead of accumulating as drift.
+    """
+
+    def __init__(self, wpm, stop_event=None, unthrottled=False):
+        self.stop_event = stop_event
+        self.unthrottled = unthrottled # Only count characters; never wait
+        self.start_time = None
+        self.next_deadline = None
+        self.chars_done = 0
+        self.rebases = 0
+        self.set_wpm(wpm)
+
+    def set_wpm(self, wpm):
+        """Changes the rate; a running schedule restarts from now at the new interval."""
+        self.target_wpm = wpm
+        self.chars_per_second = wpm * CHARS_PER_WORD / 60
+        self.interval = 1.0 / self.chars_per_second if self.chars_per_second > 0 else 0.01
+        if self.next_deadline is not None:
+            self.next_deadline = time.perf_counter()
+
+    def start(self):
+        self.start_time = time.perf_counter()
+        self.next_deadline = self.start_time
+        self.chars_done = 0
+        self.rebases = 0
+
+    def pace(self, chars=1, wait=True):
+        """Accounts for `chars` just-typed characters and waits for the next deadline.
+
+        With wait=False the deadline is only scheduled and wait() waits for it before the
+        next keystroke, so nothing waits after the last one.
+        Returns True if the wait was interrupted by the stop event.
+        """
+        self.chars_done += chars
+        if self.unthrottled:
+            return self.stop_event is not None and self.stop_event.is_set()
+        self.next_deadline += chars * self.interval
+        now = time.perf_counter()
+        if now - self.next_deadline > MAX_LAG_S:
+            # The target stalled for a long time; catching up would send a burst of keys.
+            self.next_deadline = now
+            self.rebases += 1
+            return self.stop_event is not None and self.stop_event.is_set()
+        if not wait:
+            return self.stop_event is not None and self.stop_event.is_set()
+        return wait_until(self.next_deadline, self.stop_event)
+
+    def wait(self):
+        """Waits for the deadline a pace(wait=False) left pending. Returns True if stopped."""
+        if self.unthrottled:
+            return self.stop_event is not None and self.stop_event.is_set()
+        return wait_until(self.next_deadline, self.stop_event)
+
+    def resync(self, chars=0):
+        """Accounts for `chars` delivered outside the schedule (e.g. pasted) and restarts pacing from now."""
+        self.chars_done += chars
+        self.next_deadline = time.perf_counter()
+
+    def elapsed(self):
+        if self.start_time is None:
+            return 0.0
+        return time.perf_counter() - self.start_time
+
+    def paced_elapsed(self):
+        """Elapsed time for rate purposes: the last keystrokes' interval counts even though nothing waits it out."""
+        elapsed = self.elapsed()
+        if not self.unthrottled and self.next_deadline is not None:
+            elapsed = max(elapsed, self.next_deadline - self.start_time)
+        return elapsed
+
+    def achieved_wpm(self):
+        elapsed = self.paced_elapsed()
+        if elapsed <= 0:
+            return 0.0
+        return self.chars_done / elapsed * 60 / CHARS_PER_WORD
+
+
+def split_for_clipboard(text, min_paste_len=CLIPBOARD_MIN_SEGMENT):
+    """Splits text into (kind, start, end) segments for the clipboard-assisted mode.
+
+    `kind` is 'type' or 'paste'. Characters that targets filter out of pastes, and pasteable
+    runs shorter than `min_paste_len`, end up in 'type' segments. Adjacent 'type' segments are merged.
+    """
+    segments = []
+    start = 0
+    for run in PASTE_FILTERED_CHARS_RE.split(text):
+        if not run:
+            continue
+        end = start + len(run)
+        kind = 'paste' if len(run) >= min_paste_len and not PASTE_FILTERED_CHARS_RE.match(run) else 'type'
+        if kind == 'type' and segments and segments[-1][0] == 'type':
+            segments[-1] = ('type', segments[-1][1], end)
+        else:
+            segments.append((kind, start, end))
+        start = end
+    return segments
+
+
+def paste_settle_time(chars):
+    """Time to leave the clipboard untouched after pasting `chars` characters.
+
+    For clipboards that cannot tell when the target has read them; a fixed allowance
+    that grows with the paste size.
+    """
+    return CLIPBOARD_SETTLE_BASE_S + chars / 1024 * CLIPBOARD_SETTLE_PER_KB_S
+
+
+class PasteSegmentTuner:
+    """Adapts the paste segment size to how long the target takes to read each paste.
+
+    Only reads the clipboard observed count: the size doubles while full segments are
+    read well within CLIPBOARD_TARGET_READ_S and halves when one takes longer.
+    """
+
+    def __init__(self, segment_size=CLIPBOARD_SEGMENT):
+        self.segment_size = segment_size
+
+    def record(self, chars, read_s):
+        if read_s > CLIPBOARD_TARGET_READ_S:
+            self.segment_size = max(CLIPBOARD_MIN_SEGMENT, self.segment_size // 2)
+        elif chars >= self.segment_size and read_s < CLIPBOARD_TARGET_READ_S / 2:
+            self.segment_size = min(CLIPBOARD_MAX_SEGMENT, self.segment_size * 2)
+
+
+def iter_chunk_bounds(start, end, size):
+    """Yields consecutive (start, end) bounds of run-length chunks of at most `size` characters."""
+    for chunk_start in range(start, end, size):
+        yield chunk_start, min(chunk_start + size, end)
+
+
+# --- Text Transforms ---
+# Each transform maps the text to the keystrokes that produce it in a particular kind of target.
+# They run once, before the plan is compiled; every character left is one keystroke.
+LEADING_WHITESPACE_RE = re.compile(r'^[ \t]+', re.MULTILINE)
+AUTO_CLOSED_PAIRS = {'(': ')', '[': ']', '{': '}'}
+
+
+def normalize_newlines(text, tab_width=DEFAULT_TAB_WIDTH):
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+BLOCK_OPENERS = ('{', '[', '(', ':')  # Line endings after which smart-indenting editors indent one level
+DEDENT_KEYS = KEY_SELECT_HOME_CHAR + KEY_BACKSPACE_CHAR # Selects the indentation Enter gave and deletes it
+
+
+def _type_missing_indent(text, tab_width, smart):
+    """Types only the indentation Enter does not already give.
+
+    A line whose indentation extends what Enter gave gets the rest typed. Any other line
+    has the given indentation selected with Shift+Home and deleted, then its own typed:
+    one Backspace, whatever the editor's tab stops or the keyboard layout. Blank lines
+    keep what Enter gave them, so the line after continues from the same indentation.
+    """
+    out = []
+    indent = '' # What Enter puts at the start of the next line
+    for line_number, line in enumerate(text.split('\n')):
+        body = line.lstrip(' \t')
+        if line_number:
+            out.append('\n')
+            if not body:
+                continue
+        own = line[:len(line) - len(body)]
+        if own.startswith(indent):
+            out.append(own[len(indent):])
+        else:
+            out.append(DEDENT_KEYS)
+            out.append(own)
+        out.append(body)
+        indent = own
+        if smart and body.rstrip(' \t').endswith(BLOCK_OPENERS):
+            indent += '\t' if '\t' in own else ' ' * tab_width
+    return ''.join(out)
+
+
+def keep_auto_indent(text, tab_width=DEFAULT_TAB_WIDTH):
+    """For editors that start each new line with the previous line's indentation."""
+    return _type_missing_indent(text, tab_width, smart=False)
+
+
+def smart_auto_indent(text, tab_width=DEFAULT_TAB_WIDTH):
+    """For editors that also indent one level (tab_width spaces, or a tab in tab-indented
+    code) after a line ending in an opening bracket or ':'."""
+    return _type_missing_indent(text, tab_width, smart=True)
+
+
+def indent_with_tabs(text, tab_width=DEFAULT_TAB_WIDTH):
+    """Rewrites leading runs of tab_width spaces as tabs."""
+    return LEADING_WHITESPACE_RE.sub(lambda m: m.group().expandtabs(tab_width).replace(' ' * tab_width, '\t'), text)
+
+
+def indent_with_spaces(text, tab_width=DEFAULT_TAB_WIDTH):
+    """Expands leading tabs to spaces, for targets where Tab moves the focus."""
+    return LEADING_WHITESPACE_RE.sub(lambda m: m.group().expandtabs(tab_width), text)
+
+
+def skip_auto_closed_pairs(text, tab_width=DEFAULT_TAB_WIDTH):
+    """Leaves out closing brackets the target already inserted when the opening one was typed.
+
+    Models an editor that auto-closes ( [ { outside string literals and types over a
+    closer typed right in front of it. The closers still pending after the cursor on a
+    line (`tail`) are skipped with a single End once a run of at least two of them would
+    close them all. An opener that
+    ends its line gets its pending closers pushed onto a line of their own by Enter; when
+    the text reaches that closing line, Down and End step past it instead of typing it
+    again. Closing lines that do not match exactly are typed as written.
+    """
+    out = []
+    tail = [] # Closers after the cursor on the current line, nearest last
+    blocks = [] # Tails pushed onto closing lines below, innermost last
+    for line_number, line in enumerate(text.split('\n')):
+        if line_number:
+            out.append('\n')
+        body = line.lstrip(' \t' + DEDENT_KEYS) # After the indent transforms, dedents start the line
+        if blocks and body.startswith(''.join(reversed(blocks[-1]))):
+            closing = blocks.pop()
+            out[-1] = KEY_DOWN_CHAR # Replaces the Enter; the indentation (or dedent) is never typed
+            out.append(KEY_END_CHAR)
+            line = body[len(closing):]
+            tail = []
+        elif blocks and body.startswith(blocks[-1][-1]):
+            blocks.pop() # Closed differently than the target expects; typed as written
+        quote = None # Brackets inside a string literal are not auto-closed
+        i = 0
+        while i < len(line):
+            char = line[i]
+            if quote is not None:
+                if char == '\\':
+                    out.append(line[i:i + 2])
+                    i += 2
+                    continue
+                if char == quote:
+                    quote = None
+            elif char in '"\'`':
+                quote = char
+            elif tail and char == tail[-1]:
+                run = 0
+                while run < len(tail) and i + run < len(line) and line[i + run] == tail[-1 - run]:
+                    run += 1
+                if run == len(tail) and run >= 2:
+                    out.append(KEY_END_CHAR)
+                else:
+                    out.append(line[i:i + run]) # Typed over one by one
+                del tail[len(tail) - run:]
+                i += run
+                continue
+            out.append(char)
+            if quote is None and char in AUTO_CLOSED_PAIRS:
+                tail.append(AUTO_CLOSED_PAIRS[char])
+            i += 1
+        if tail and line.rstrip(' \t').endswith(tuple(AUTO_CLOSED_PAIRS)):
+            # Enter between an opener and its closer puts the closers on a new line below the cursor
+            blocks.append(tail)
+            tail = []
+        # Otherwise Enter splits the line and the pending closers stay right after the cursor
+    return ''.join(out)
+
+
+TEXT_TRANSFORMS = {
+    'normalize-newlines': normalize_newlines,
+    'keep-indent': keep_auto_indent,
+    'smart-indent': smart_auto_indent,
+    'tabs': indent_with_tabs,
+    'spaces': indent_with_spaces,
+    'skip-pairs': skip_auto_closed_pairs,
+}
+
+
+def preprocess_text(text, transforms, tab_width=DEFAULT_TAB_WIDTH):
+    """Applies the named TEXT_TRANSFORMS in order. Returns (text, keystrokes_saved)."""
+    original_length = len(text)
+    transform_start = time.perf_counter()
+    for name in transforms:
+        text = TEXT_TRANSFORMS[name](text, tab_width)
+    saved = original_length - len(text)
+    if transforms:
+        logging.info(f"Text transforms {', '.join(transforms)}: {original_length} -> {len(text)} keystrokes "
+                     f"({saved} saved) in {(time.perf_counter() - transform_start) * 1000:.1f}ms.")
+    return text, saved
+
+
+# --- Keystroke Plans ---
+# Control characters that are sent as named keys rather than as characters (filled in by load_keyboard_modules()).
+CONTROL_CHAR_KEYS = {}
+
+
+def resolve_key(char):
+    """Resolves a character to the pynput key object pressed for it."""
+    key = CONTROL_CHAR_KEYS.get(char)
+    if key is None:
+        key = KeyCode.from_char(char)
+    return key
+
+
+class KeystrokePlan:
+    """Text precompiled into one key index per character.
+
+    `chars` holds each distinct character once and `key_indices[i]` is the index in
+    `chars` of character i; typing it is a press and a release of that key. The keyboard
+    backend resolves `chars` to its own keys once per plan.
+    """
+
+    __slots__ = ('text_hash', 'chars', 'key_indices', 'char_count')
+
+    def __init__(self, text_hash, chars, key_indices, char_count):
+        self.text_hash = text_hash
+        self.chars = chars
+        self.key_indices = key_indices
+        self.char_count = char_count
+
+    def __len__(self):
+        return self.char_count
+
+
+def hash_text(text):
+    return hashlib.sha256(text.encode('utf-8', 'surrogatepass')).hexdigest()
+
+
+def hash_file(path, block_size=1 << 20):
+    """SHA-256 of a file's bytes; equals hash_text() of its contents for UTF-8 files."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# --- Session Checkpoints ---
+class SessionCheckpoint:
+    """Small on-disk record of how far a session got, keyed by the hash of its text.
+
+    The typing engine calls maybe_save() as it goes; the file is rewritten atomically at
+    most every `interval` characters, so an interrupted session (including a crash) can
+    resume from the last checkpoint.
+    """
+
+    def __init__(self, path, text_hash, total_chars=None, interval=CHECKPOINT_INTERVAL_CHARS):
+        self.path = path
+        self.text_hash = text_hash
+        self.total_chars = total_chars
+        self.interval = interval
+        self.saved_offset = None
+
+    @staticmethod
+    def default_path():
+        return os.path.join(user_data_dir(), CHECKPOINT_FILENAME)
+
+    @staticmethod
+    def load_offset(path, text_hash):
+        """Returns the checkpointed offset for `text_hash`, or 0 if there is none."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable checkpoint file {path}: {e}")
+            return 0
+        if state.get('text_hash') != text_hash:
+            return 0
+        return max(0, int(state.get('offset', 0)))
+
+    def maybe_save(self, offset):
+        if self.saved_offset is None or offset - self.saved_offset >= self.interval:
+            self.save(offset)
+
+    def save(self, offset):
+        state = {'version': 1, 'text_hash': self.text_hash, 'offset': offset,
+                 'total_chars': self.total_chars, 'updated': time.time()}
+        temp_path = self.path + '.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.replace(temp_path, self.path)
+            self.saved_offset = offset
+        except OSError as e:
+            logging.error(f"Failed to write checkpoint {self.path}: {e}")
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logging.error(f"Failed to remove checkpoint {self.path}: {e}")
+
+
+def compile_keystroke_plan(text, text_hash=None):
+    """Compiles `text` into a KeystrokePlan, indexing every distinct character once."""
+    chars = list(set(text))
+    index_of = {char: index for index, char in enumerate(chars)}
+    key_indices = array('I', [index_of[char] for char in text])
+    return KeystrokePlan(text_hash or hash_text(text), chars, key_indices, len(text))
+
+
+_plan_cache = OrderedDict()
+_plan_cache_lock = threading.Lock() # Large pastes are compiled on a loader thread
+
+
+def get_keystroke_plan(text):
+    """Returns the compiled plan for `text`, reusing a cached one when the same text is re-armed."""
+    text_hash = hash_text(text)
+    with _plan_cache_lock:
+        plan = _plan_cache.get(text_hash)
+        if plan is not None:
+            _plan_cache.move_to_end(text_hash)
+    if plan is not None:
+        logging.info(f"Reusing cached keystroke plan {text_hash[:12]} ({plan.char_count} characters).")
+        return plan
+    compile_start = time.perf_counter()
+    plan = compile_keystroke_plan(text, text_hash)
+    with _plan_cache_lock:
+        _plan_cache[text_hash] = plan
+        while len(_plan_cache) > PLAN_CACHE_SIZE:
+            _plan_cache.popitem(last=False)
+    logging.info(f"Compiled keystroke plan {text_hash[:12]}: {plan.char_count} characters, "
+                 f"{len(plan.chars)} distinct characters in {(time.perf_counter() - compile_start) * 1000:.1f}ms.")
+    return plan
+
+
+# --- Hotkeys ---
+def parse_hotkey(hotkey_str):
+    """Returns the canonical pynput key for a single-key hotkey string such as 'z' or 'f8'.
+
+    Named keys become KeyCode.from_vk() like in HotKey.parse, which is what the
+    listener's canonical() turns a press of such a key into.
+    """
+    load_keyboard_modules()
+    if len(hotkey_str) == 1:
+        return KeyCode.from_char(hotkey_str)
+    return KeyCode.from_vk(getattr(Key, hotkey_str).value.vk)
+
+
+def key_identity(key):
+    """Comparable identity of a key, the same for a hotkey, a typed character and a canonical listener key.
+
+    Characters compare case-insensitively. Characters typed as named keys (newline, tab,
+    KEY_DOWN_CHAR, ...) and space compare as that key, and named keys by their virtual key code.
+    """
+    char = key if isinstance(key, str) else getattr(key, 'char', None)
+    if char:
+        named = CONTROL_CHAR_KEYS.get(char) or (Key.space if char == ' ' and Key is not None else None)
+        if named is None:
+            return char.lower()
+        key = named
+    vk = getattr(getattr(key, 'value', key), 'vk', None) # Key members wrap a KeyCode
+    return key if vk is None else vk
+
+
+class SyntheticEventFilter:
+    """Recognizes key events this process injected, so the hotkey listener can drop them.
+
+    On Windows the hook tags injected events (LLKHF_INJECTED) and win32_event_filter()
+    drops them before any Python callback runs. Elsewhere the typing engine reports each
+    press of a watched (hotkey) key through note_injected(), and the listener's next matching
+    event consumes that expected echo; echoes that never arrive expire after SYNTHETIC_ECHO_TIMEOUT_S.
+    Counters are updated from the listener thread for per-session cost reporting.
+    """
+
+    def __init__(self):
+        self.tags_injected = sys.platform == 'win32'
+        self._watched = frozenset()
+        self._pending = {}
+        self.events_seen = 0
+        self.synthetic_dropped = 0
+        self.listener_cpu_s = 0.0 # CPU time of the listener thread as of its latest event
+
+    def set_watched_keys(self, keys):
+        self._watched = frozenset(key_identity(key) for key in keys)
+        self._pending = {identity: deque() for identity in self._watched}
+
+    def watches(self, key):
+        """True if injecting `key` must be reported through note_injected()."""
+        return not self.tags_injected and key_identity(key) in self._watched
+
+    @property
+    def reported_identities(self):
+        """Identities of the keys watches() is True for."""
+        return frozenset() if self.tags_injected else self._watched
+
+    def note_injected(self, key):
+        pending = self._pending.get(key_identity(key))
+        if pending is not None:
+            pending.append(time.perf_counter() + SYNTHETIC_ECHO_TIMEOUT_S)
+
+    def is_synthetic(self, key):
+        """Listener thread: True if this press is the echo of an injected key."""
+        if self.tags_injected:
+            return False # Already filtered by win32_event_filter
+        self.events_seen += 1
+        self.listener_cpu_s = time.thread_time()
+        pending = self._pending.get(key_identity(key))
+        if not pending:
+            return False
+        now = time.perf_counter()
+        while pending and pending[0] < now:
+            pending.popleft()
+        if pending:
+            pending.popleft()
+            self.synthetic_dropped += 1
+            return True
+        return False
+
+    def win32_event_filter(self, msg, data):
+        """pynput win32 hook filter: returning False keeps injected events away from the listener callbacks."""
+        self.events_seen += 1
+        self.listener_cpu_s = time.thread_time()
+        if data.flags & LLKHF_INJECTED:
+            self.synthetic_dropped += 1
+            return False
+        return True
+
+    def snapshot(self):
+        return self.events_seen, self.synthetic_dropped, self.listener_cpu_s
+
+
+class HotkeyDispatcher:
+    """One long-lived keyboard listener that routes physical presses through a hotkey -> action table.
+
+    The table is a dict that set_bindings() builds aside and swaps in with a single assignment,
+    so bindings change without restarting the listener and each event costs one lookup.
+    Actions run on the listener thread and must stay short.
+    """
+
+    def __init__(self, synthetic_filter=None):
+        self.synthetic_filter = synthetic_filter
+        self.listener = None
+        self._table = {}
+
+    @property
+    def running(self):
+        return self.listener is not None and self.listener.running
+
+    def start(self):
+        """Starts the listener if it is not running yet."""
+        if self.running:
+            return
+        load_keyboard_modules()
+        options = {}
+        if self.synthetic_filter is not None:
+            options['win32_event_filter'] = self.synthetic_filter.win32_event_filter
+        self.listener = keyboard.Listener(on_press=self._on_press, **options)
+        self.listener.start()
+
+    def stop(self):
+        if self.running:
+            self.listener.stop()
+            self.listener.join(timeout=1)
+
+    def set_bindings(self, bindings, required=()):
+        """Atomically replaces the table with `bindings` ({hotkey string: action}).
+
+        A hotkey in `required` that does not parse raises ValueError or AttributeError and
+        the old table stays active. Any other is left out with a warning (e.g. a snippet on
+        'insert', which pynput has no key for on macOS).
+        """
+        keys = {}
+        for hotkey in bindings:
+            try:
+                keys[hotkey] = parse_hotkey(hotkey)
+            except (ValueError, AttributeError) as e:
+                if hotkey in required:
+                    raise
+                logging.warning(f"Hotkey '{hotkey}' is not a key on this system and stays unbound: {e!r}")
+        table = {key_identity(key): bindings[hotkey] for hotkey, key in keys.items()}
+        if self.synthetic_filter is not None:
+            self.synthetic_filter.set_watched_keys(keys.values())
+        self._table = table
+
+    def _on_press(self, key):
+        traced("key event", "listener", self._dispatch, key)
+
+    def _dispatch(self, key):
+        """Listener thread: drops the app's own injected keys, then looks the press up in the table."""
+        key = self.listener.canonical(key)
+        if self.synthetic_filter is not None and self.synthetic_filter.is_synthetic(key):
+            return
+        action = self._table.get(key_identity(key))
+        if action is not None:
+            try:
+                traced(getattr(action, '__name__', "hotkey action"), "hotkey", action)
+            except Exception as e:
+                logging.error(f"Error in hotkey action: {e}")
+
+
+# --- Text Sources ---
+class MappedTextSource:
+    """Memory-mapped text file decoded incrementally, for inputs too large to hold in memory.
+
+    read(size) returns up to `size` characters, like a text file object, so the typing
+    engine can stream it. Only the window being decoded and the returned block are held
+    as Python objects; the mapped pages are clean and reclaimable by the OS. Line endings
+    are normalized to '\\n' (a CRLF would otherwise be typed as two Enter presses).
+    Progress is available in characters (chars_read) and bytes (byte_position()).
+    """
+
+    def __init__(self, path, encoding='utf-8', window_bytes=MMAP_WINDOW_BYTES):
+        self.path = path
+        self.encoding = encoding
+        self.window_bytes = window_bytes
+        self._file = open(path, 'rb')
+        self.size = os.fstat(self._file.fileno()).st_size
+        # mmap cannot map an empty file
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        self._map_offset = 0
+        self._pending = '' # Decoded but not yet returned (raw line endings)
+        self._bytes_returned = 0
+        self.chars_read = 0
+        # (char_start, byte_start, raw_text) of the block returned last, for byte_position()
+        self._last_block = (0, 0, '')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def _fill(self, chars):
+        """Decodes further windows until at least `chars` characters are pending or the file ends."""
+        while len(self._pending) < chars and self._map is not None and self._map_offset < self.size:
+            window = self._map[self._map_offset:self._map_offset + self.window_bytes]
+            self._map_offset += len(window)
+            self._pending += self._decoder.decode(window, final=self._map_offset >= self.size)
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.size # Characters never outnumber bytes
+        # One extra character so a CRLF is never split across two blocks
+        self._fill(size + 1)
+        raw = self._pending[:size]
+        if raw.endswith('\r') and self._pending[size:size + 1] == '\n':
+            raw += '\n'
+        self._pending = self._pending[len(raw):]
+        if not raw:
+            return ''
+        byte_start = self._bytes_returned
+        self._bytes_returned += len(raw.encode(self.encoding, 'replace'))
+        text = raw.replace('\r\n', '\n').replace('\r', '\n')
+        self._last_block = (self.chars_read, byte_start, raw)
+        self.chars_read += len(text)
+        return text
+
+    def byte_position(self, char_position):
+        """Byte offset in the file of character `char_position` of the most recently read block (approximate elsewhere)."""
+        char_start, byte_start, raw = self._last_block
+        if char_position <= char_start:
+            return min(byte_start, self.size)
+        raw_end = char_position - char_start
+        for match in re.finditer('\r\n', raw):
+            if match.start() >= raw_end:
+                break
+            raw_end += 1 # A normalized CRLF is one character but two raw ones
+        return min(byte_start + len(raw[:raw_end].encode(self.encoding, 'replace')), self.size)
+
+
+class TextDocument:
+    """A large pasted text, normalized once and indexed by line for the virtualized preview.
+
+    Built off the Tk thread: normalizing, indexing and compiling a multi-megabyte text
+    takes far longer than a frame. `line_starts` holds the offset of every line, so
+    any window of lines is a single slice of `text`.
+    """
+
+    def __init__(self, raw_text):
+        # Same normalization as the text box: one Enter per line break, no surrounding blanks
+        self.text = raw_text.replace('\r\n', '\n').replace('\r', '\n').strip()
+        self.line_starts = array('Q', [0])
+        self.line_starts.extend(match.end() for match in re.finditer('\n', self.text))
+        self.plan = get_keystroke_plan(self.text)
+
+    @property
+    def line_count(self):
+        return len(self.line_starts)
+
+    def lines(self, first, count):
+        """Lines first..first+count-1 for display, each cut to PREVIEW_MAX_LINE_CHARS."""
+        first = max(0, min(first, self.line_count - 1))
+        last = min(first + count, self.line_count)
+        end = self.line_starts[last] - 1 if last < self.line_count else len(self.text)
+        window = self.text[self.line_starts[first]:end].split('\n')
+        return '\n'.join(line if len(line) <= PREVIEW_MAX_LINE_CHARS else line[:PREVIEW_MAX_LINE_CHARS] + ' \u2026'
+                         for line in window)
+
+
+class CsvFormSource:
+    """Rows of a CSV file as form-fill keystrokes, read like a text stream one record at a time.
+
+    Fields are joined by `field_key` and every record ends with `record_key` (characters,
+    see FORM_FILL_KEYS); blank lines are skipped. read(size) never returns text from two
+    records, so the typing engine types a record per block and asks pause_after_block()
+    for the delay before the next one. Only the current record and the one after it are
+    held in memory, whatever the file size.
+    """
+
+    def __init__(self, path, field_key='\t', record_key='\n', record_delay=0.0, skip_header=False,
+                 delimiter=',', encoding='utf-8'):
+        self.path = path
+        self.field_key = field_key
+        self.record_key = record_key
+        self.record_delay = record_delay
+        self.skip_header = skip_header
+        self.delimiter = delimiter
+        self.encoding = encoding
+        self._file = open(path, 'r', encoding=encoding, errors='replace', newline='')
+        self._reader = csv.reader(self._file, delimiter=delimiter)
+        if skip_header:
+            next(self._reader, None)
+        self.row_count = None # Set by count_rows()
+        self.rows_read = 0 # Records read() has started returning, counting those skipped on resume
+        self.chars_read = 0
+        self._pending = '' # Rest of the current record
+        self._record_start = 0 # Character offsets of the current record
+        self._record_end = 0
+        self._next_row = self._next_record() # One record of lookahead, for pause_after_block()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._file.close()
+
+    def count_rows(self):
+        """Counts the records in a separate pass over the file (for progress), without holding them."""
+        with open(self.path, 'r', encoding=self.encoding, errors='replace', newline='') as f:
+            rows = sum(1 for row in csv.reader(f, delimiter=self.delimiter) if row)
+        self.row_count = max(0, rows - self.skip_header)
+        return self.row_count
+
+    def _next_record(self):
+        for row in self._reader:
+            if row:
+                return row
+        return None
+
+    def read(self, size=-1):
+        if not self._pending:
+            if self._next_row is None:
+                return ''
+            # A line break inside a quoted field is typed as one Enter, whatever the file's line endings
+            self._pending = self.field_key.join(field.replace('\r\n', '\n').replace('\r', '\n')
+                                                for field in self._next_row) + self.record_key
+            self._next_row = self._next_record()
+            self.rows_read += 1
+            self._record_start = self.chars_read
+            self._record_end = self.chars_read + len(self._pending)
+        if 0 <= size < len(self._pending):
+            text, self._pending = self._pending[:size], self._pending[size:]
+        else:
+            text, self._pending = self._pending, ''
+        self.chars_read += len(text)
+        return text
+
+    def pause_after_block(self):
+        """Seconds to wait once the block read last is typed: the record delay between two records."""
+        return self.record_delay if not self._pending and self._next_row is not None else 0.0
+
+    def row_start(self, offset):
+        """The offset of the start of the record that character `offset` is in (or `offset` between records)."""
+        return offset if offset >= self._record_end else self._record_start
+
+    def rows_done(self, offset):
+        """Records completely typed once the source has been typed up to `offset`."""
+        return self.rows_read - (offset < self._record_end)
+
+
+class RowCheckpoint(SessionCheckpoint):
+    """A SessionCheckpoint for a CsvFormSource that only records offsets at record starts,
+    so a resumed batch re-enters the interrupted record from its first field."""
+
+    def __init__(self, path, text_hash, source):
+        super().__init__(path, text_hash)
+        self.source = source
+
+    def maybe_save(self, offset):
+        if self.source.row_start(offset) != self.saved_offset:
+            self.save(offset)
+
+    def save(self, offset):
+        super().save(self.source.row_start(offset))
+
+
+def hash_csv_form(path, field_key, record_key, skip_header, delimiter=','):
+    """Checkpoint key of a form fill: the file's contents and everything that changes the typed text."""
+    return hash_text(f"{hash_file(path)}|{field_key!r}|{record_key!r}|{skip_header}|{delimiter!r}")
+
+
+# --- Snippet Library ---
+_SNIPPET_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snippets (
+    name TEXT PRIMARY KEY,
+    hotkey TEXT UNIQUE,
+    wpm INTEGER,
+    length INTEGER NOT NULL,
+    text_hash TEXT NOT NULL,
+    body TEXT NOT NULL -- Last, so reading the index columns never touches the bodies' pages
+);
+CREATE TABLE IF NOT EXISTS snippet_tags (
+    tag TEXT NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (tag, name)
+);
+"""
+
+
+class Snippet:
+    """Index entry of a stored snippet; its body stays on disk until SnippetStore.load()."""
+
+    __slots__ = ('name', 'tags', 'hotkey', 'wpm', 'length', 'text_hash')
+
+    def __init__(self, name, tags, hotkey, wpm, length, text_hash):
+        self.name = name
+        self.tags = tags
+        self.hotkey = hotkey # Single-key hotkey string, or None
+        self.wpm = wpm # Typing speed, or None for the current setting
+        self.length = length
+        self.text_hash = text_hash
+
+
+class SnippetStore:
+    """Named texts with tags, an optional hotkey and an optional rate, in one SQLite file.
+
+    Opening the store reads only the index (everything but the bodies) into `index`.
+    load() fetches a body on first use and compiles its keystroke plan; both are kept
+    in an LRU cache bounded by entries and characters, so a large library costs little
+    at startup and in memory. Use the store from one thread.
+    """
+
+    def __init__(self, path=None, cache_entries=SNIPPET_CACHE_ENTRIES, cache_chars=SNIPPET_CACHE_CHARS):
+        import sqlite3 # Only needed once the snippet library is used
+        self.path = path or os.path.join(user_data_dir(), SNIPPETS_FILENAME)
+        self.cache_entries = cache_entries
+        self.cache_chars = cache_chars
+        self._db = sqlite3.connect(self.path)
+        self._db.executescript(_SNIPPET_SCHEMA)
+        self.index = {name: Snippet(name, (), hotkey, wpm, length, text_hash) for name, hotkey, wpm, length, text_hash
+                      in self._db.execute("SELECT name, hotkey, wpm, length, text_hash FROM snippets")}
+        for tag, name in self._db.execute("SELECT tag, name FROM snippet_tags ORDER BY tag"):
+            if name in self.index:
+                self.index[name].tags += (tag,)
+        self._cache = OrderedDict() # name -> (body, plan), least recently used first
+        self._cached_chars = 0
+        logging.info(f"Snippet library {self.path}: {len(self.index)} snippets indexed.")
+
+    def close(self):
+        self._db.close()
+
+    def names(self, tag=None):
+        return sorted(name for name, snippet in self.index.items() if tag is None or tag in snippet.tags)
+
+    def tags(self):
+        return sorted({tag for snippet in self.index.values() for tag in snippet.tags})
+
+    def load(self, name):
+        """Returns (body, plan) of snippet `name`, reading and compiling it on a cache miss."""
+        entry = self._cache.get(name)
+        if entry is not None:
+            self._cache.move_to_end(name)
+            return entry
+        row = self._db.execute("SELECT body FROM snippets WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            raise KeyError(name)
+        body = row[0]
+        entry = self._cache[name] = (body, compile_keystroke_plan(body, self.index[name].text_hash))
+        self._cached_chars += len(body)
+        # The newest entry stays even if it alone exceeds the character budget
+        while len(self._cache) > 1 and (len(self._cache) > self.cache_entries or self._cached_chars > self.cache_chars):
+            evicted, _ = self._cache.popitem(last=False)[1]
+            self._cached_chars -= len(evicted)
+        return entry
+
+    def save(self, name, body, tags=(), hotkey=None, wpm=None):
+        """Adds or replaces snippet `name`. Raises ValueError for an empty name or a hotkey in use."""
+        name = name.strip()
+        if not name:
+            raise ValueError("A snippet needs a name.")
+        hotkey = hotkey.strip().lower() if hotkey else None
+        for other in self.index.values():
+            if hotkey and other.hotkey == hotkey and other.name != name:
+                raise ValueError(f"Hotkey {hotkey} is already used by snippet '{other.name}'.")
+        tags = tuple(sorted({tag for tag in tags if tag}))
+        text_hash = hash_text(body)
+        with self._db: # One transaction
+            self._db.execute("INSERT INTO snippets (name, hotkey, wpm, length, text_hash, body) "
+                             "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(name) DO UPDATE SET hotkey = excluded.hotkey, "
+                             "wpm = excluded.wpm, length = excluded.length, text_hash = excluded.text_hash, "
+                             "body = excluded.body", (name, hotkey, wpm, len(body), text_hash, body))
+            self._db.execute("DELETE FROM snippet_tags WHERE name = ?", (name,))
+            self._db.executemany("INSERT INTO snippet_tags (tag, name) VALUES (?, ?)", [(tag, name) for tag in tags])
+        self._forget(name)
+        self.index[name] = Snippet(name, tags, hotkey, wpm, len(body), text_hash)
+        logging.info(f"Snippet '{name}' saved ({len(body)} characters, hotkey {hotkey}, tags {', '.join(tags)}).")
+
+    def delete(self, name):
+        with self._db:
+            self._db.execute("DELETE FROM snippets WHERE name = ?", (name,))
+            self._db.execute("DELETE FROM snippet_tags WHERE name = ?", (name,))
+        self._forget(name)
+        self.index.pop(name, None)
+        logging.info(f"Snippet '{name}' deleted.")
+
+    def _forget(self, name):
+        entry = self._cache.pop(name, None)
+        if entry is not None:
+            self._cached_chars -= len(entry[0])
+
+
+# --- Keyboard Backends ---
+# A backend turns plan characters into key events: resolve(chars) maps characters to its
+# own key objects once per plan, press(key)/release(key) queue events, flush() delivers
+# everything queued (once per character or burst), send_paste() sends the paste shortcut
+# and close() releases the backend's resources.
+class PynputBackend:
+    """Injects keys through pynput's Controller; works on every platform."""
+
+    name = 'pynput'
+
+    def __init__(self):
+        load_keyboard_modules()
+        self.controller = Controller()
+
+    def resolve(self, chars):
+        """pynput keys; a (Key.shift, key) pair for the SHIFTED_CONTROL_CHARS."""
+        return [(Key.shift, resolve_key(char)) if char in SHIFTED_CONTROL_CHARS else resolve_key(char)
+                for char in chars]
+
+    def press(self, key):
+        if key.__class__ is tuple:
+            self.controller.press(key[0])
+            key = key[1]
+        self.controller.press(key)
+
+    def release(self, key):
+        if key.__class__ is tuple:
+            self.controller.release(key[1])
+            key = key[0]
+        self.controller.release(key)
+
+    def flush(self):
+        pass # pynput sends each event immediately
+
+    def send_paste(self):
+        modifier = Key.cmd if sys.platform == 'darwin' else Key.ctrl
+        with self.controller.pressed(modifier):
+            self.controller.press('v')
+            self.controller.release('v')
+
+    def close(self):
+        pass
+
+
+class XTestBackend:
+    """Injects keys with the X11 XTest extension (libXtst), batching events per flush().
+
+    Fake key events queue in Xlib's output buffer and go to the server in one write
+    per flush() instead of one round trip each. Characters missing from the keyboard map
+    are typed by binding their keysym to a spare keycode for the moment. Needs an X
+    display (DISPLAY, e.g. a local Xvfb) and libX11/libXtst.
+    """
+
+    name = 'xtest'
+    XK_SHIFT_L = 0xffe1
+    XK_CONTROL_L = 0xffe3
+    XK_V = 0x0076
+    CONTROL_KEYSYMS = {'\n': 0xff0d, '\r': 0xff0d, '\t': 0xff09, KEY_DOWN_CHAR: 0xff54, KEY_END_CHAR: 0xff57,
+                       KEY_BACKSPACE_CHAR: 0xff08, KEY_SELECT_HOME_CHAR: 0xff50}
+
+    def __init__(self, display_name=None):
+        import ctypes
+        import ctypes.util
+        xlib_path = ctypes.util.find_library('X11')
+        xtst_path = ctypes.util.find_library('Xtst')
+        if not xlib_path or not xtst_path:
+            raise OSError("The xtest backend needs libX11 and libXtst.")
+        self._ctypes = ctypes
+        xlib = self._xlib = ctypes.CDLL(xlib_path)
+        xtst = ctypes.CDLL(xtst_path)
+        display_p, keysym_t = ctypes.c_void_p, ctypes.c_ulong
+        xlib.XOpenDisplay.restype = display_p
+        xlib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        xlib.XKeysymToKeycode.restype = ctypes.c_ubyte
+        xlib.XKeysymToKeycode.argtypes = [display_p, keysym_t]
+        xlib.XkbKeycodeToKeysym.restype = keysym_t
+        xlib.XkbKeycodeToKeysym.argtypes = [display_p, ctypes.c_ubyte, ctypes.c_int, ctypes.c_int]
+        xlib.XDisplayKeycodes.argtypes = [display_p, ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_int)]
+        xlib.XGetKeyboardMapping.restype = ctypes.POINTER(keysym_t)
+        xlib.XGetKeyboardMapping.argtypes = [display_p, ctypes.c_ubyte, ctypes.c_int, ctypes.POINTER(ctypes.c_int)]
+        xlib.XChangeKeyboardMapping.argtypes = [display_p, ctypes.c_int, ctypes.c_int, ctypes.POINTER(keysym_t), ctypes.c_int]
+        xlib.XFree.argtypes = [ctypes.c_void_p]
+        xlib.XFlush.argtypes = [display_p]
+        xlib.XSync.argtypes = [display_p, ctypes.c_int]
+        xlib.XCloseDisplay.argtypes = [display_p]
+        xtst.XTestFakeKeyEvent.argtypes = [display_p, ctypes.c_uint, ctypes.c_int, ctypes.c_ulong]
+        self._fake_key_event = xtst.XTestFakeKeyEvent
+        self._display = xlib.XOpenDisplay(display_name.encode() if display_name else None)
+        if not self._display:
+            raise OSError(f"Cannot open X display {display_name or os.environ.get('DISPLAY', '(unset)')}.")
+        self._shift = xlib.XKeysymToKeycode(self._display, self.XK_SHIFT_L)
+        self._scratch = self._find_spare_keycode()
+        self._scratch_keysym = 0
+
+    def _find_spare_keycode(self):
+        """A keycode with no keysyms bound, used for characters the keyboard map lacks."""
+        ctypes = self._ctypes
+        low, high, per_code = ctypes.c_int(), ctypes.c_int(), ctypes.c_int()
+        self._xlib.XDisplayKeycodes(self._display, ctypes.byref(low), ctypes.byref(high))
+        count = high.value - low.value + 1
+        mapping = self._xlib.XGetKeyboardMapping(self._display, low.value, count, ctypes.byref(per_code))
+        try:
+            for index in range(count - 1, -1, -1):
+                syms = mapping[index * per_code.value:(index + 1) * per_code.value]
+                if not any(syms):
+                    return low.value + index
+        finally:
+            self._xlib.XFree(mapping)
+        return None
+
+    def _keysym(self, char):
+        keysym = self.CONTROL_KEYSYMS.get(char)
+        if keysym is not None:
+            return keysym
+        code = ord(char)
+        # Latin-1 keysyms equal their code points; everything else uses the Unicode keysym range
+        return code if 0x20 <= code <= 0x7e or 0xa0 <= code <= 0xff else 0x01000000 | code
+
+    def resolve(self, chars):
+        """(keycode, shifted, keysym) per character; keycode 0 means the spare keycode is bound at press time."""
+        keys = []
+        for char in chars:
+            keysym = self._keysym(char)
+            keycode = self._xlib.XKeysymToKeycode(self._display, keysym)
+            shifted = False
+            if keycode:
+                if self._xlib.XkbKeycodeToKeysym(self._display, keycode, 0, 0) == keysym:
+                    pass
+                elif self._xlib.XkbKeycodeToKeysym(self._display, keycode, 0, 1) == keysym:
+                    shifted = True
+                else:
+                    keycode = 0 # Only on a level this backend does not drive (e.g. AltGr)
+            keys.append((keycode, shifted or char in SHIFTED_CONTROL_CHARS, keysym))
+        return keys
+
+    def _keycode(self, key):
+        keycode, shifted, keysym = key
+        if keycode:
+            return keycode
+        if self._scratch is None:
+            raise OSError(f"No spare keycode to type keysym {keysym:#x}.")
+        if self._scratch_keysym != keysym:
+            # Deliver events for the previous binding before the keycode changes meaning
+            self._xlib.XSync(self._display, 0)
+            syms = (self._ctypes.c_ulong * 1)(keysym)
+            self._xlib.XChangeKeyboardMapping(self._display, self._scratch, 1, syms, 1)
+            self._xlib.XSync(self._display, 0)
+            self._scratch_keysym = keysym
+        return self._scratch
+
+    def press(self, key):
+        if key[1]:
+            self._fake_key_event(self._display, self._shift, 1, 0)
+        self._fake_key_event(self._display, self._keycode(key), 1, 0)
+
+    def release(self, key):
+        self._fake_key_event(self._display, self._keycode(key), 0, 0)
+        if key[1]:
+            self._fake_key_event(self._display, self._shift, 0, 0)
+
+    def flush(self):
+        self._xlib.XFlush(self._display)
+
+    def send_paste(self):
+        control = self._xlib.XKeysymToKeycode(self._display, self.XK_CONTROL_L)
+        v = self._xlib.XKeysymToKeycode(self._display, self.XK_V)
+        for keycode, is_press in ((control, 1), (v, 1), (v, 0), (control, 0)):
+            self._fake_key_event(self._display, keycode, is_press, 0)
+        self.flush()
+
+    def close(self):
+        if self._display is None:
+            return
+        if self._scratch_keysym:
+            syms = (self._ctypes.c_ulong * 1)(0)
+            self._xlib.XChangeKeyboardMapping(self._display, self._scratch, 1, syms, 1)
+        self._xlib.XSync(self._display, 0)
+        self._xlib.XCloseDisplay(self._display)
+        self._display = None
+
+
+class RecordingBackend:
+    """Records the key event stream in memory instead of injecting it.
+
+    `events` holds (perf_counter timestamp, kind, char) tuples, kind being 'press',
+    'release' or 'paste' (char None). Needs no desktop, so sessions can be checked for
+    correctness and pacing anywhere.
+    """
+
+    name = 'recording'
+
+    def __init__(self):
+        self.events = []
+        self.flushes = 0
+
+    def resolve(self, chars):
+        return list(chars)
+
+    def press(self, char):
+        self.events.append((time.perf_counter(), 'press', char))
+
+    def release(self, char):
+        self.events.append((time.perf_counter(), 'release', char))
+
+    def flush(self):
+        self.flushes += 1
+
+    def send_paste(self):
+        self.events.append((time.perf_counter(), 'paste', None))
+
+    def close(self):
+        pass
+
+    def typed_text(self):
+        """The characters pressed, in order (pastes are not included)."""
+        return ''.join(char for timestamp, kind, char in self.events if kind == 'press')
+
+    def press_intervals(self):
+        """Seconds between consecutive key presses."""
+        times = [timestamp for timestamp, kind, char in self.events if kind == 'press']
+        return [later - earlier for earlier, later in zip(times, times[1:])]
+
+
+KEYBOARD_BACKENDS = {
+    'pynput': PynputBackend,
+    'xtest': XTestBackend,
+    'recording': RecordingBackend,
+}
+
+
+def create_keyboard_backend(name=DEFAULT_KEYBOARD_BACKEND):
+    backend = KEYBOARD_BACKENDS[name]()
+    logging.info(f"Keyboard backend: {name}.")
+    return backend
+
+
+# --- Session Metrics ---
+class SessionMetrics:
+    """Structured measurements of one typing session, filled in by the typing thread.
+
+    Each keystroke batch (one character, or one burst) records how long the backend took
+    to inject it, bucketed into INJECTION_LATENCY_BUCKETS_US, and how late it started
+    against the pacing schedule; the worst lateness is the longest stall. snapshot()
+    may be called from any thread while the session runs.
+    """
+
+    def __init__(self, target_wpm, start_offset=0, total_chars=None):
+        self.target_cps = target_wpm * CHARS_PER_WORD / 60
+        self.start_offset = start_offset
+        self.total_chars = total_chars
+        self.position = start_offset
+        self.created = time.perf_counter()
+        self.countdown_s = None
+        self.typing_started = None
+        self.pacer = None # KeystrokePacer of the session; achieved_cps uses its paced elapsed time
+        self.first_key_at = None
+        self.finished_at = None
+        self.stop_requested_at = None
+        self.chars_typed = 0
+        self.chars_pasted = 0
+        self.batches = 0
+        self.latency_counts = [0] * (len(INJECTION_LATENCY_BUCKETS_US) + 1)
+        self.latency_total_s = 0.0
+        self.longest_stall_s = 0.0
+
+    def record_batch(self, chars, latency_s, lateness_s):
+        if self.first_key_at is None:
+            self.first_key_at = time.perf_counter() - latency_s
+        self.chars_typed += chars
+        self.batches += 1
+        self.latency_total_s += latency_s
+        self.latency_counts[bisect_left(INJECTION_LATENCY_BUCKETS_US, latency_s * 1e6)] += 1
+        if lateness_s > self.longest_stall_s:
+            self.longest_stall_s = lateness_s
+
+    def record_paste(self, chars):
+        if self.first_key_at is None:
+            self.first_key_at = time.perf_counter()
+        self.chars_pasted += chars
+
+    def snapshot(self):
+        """JSON-ready view of the measurements so far."""
+        end = self.finished_at or time.perf_counter()
+        elapsed = end - self.typing_started if self.typing_started is not None else 0.0
+        rate_elapsed = elapsed
+        if self.pacer is not None and self.pacer.start_time is not None and not self.pacer.unthrottled:
+            # Same measure as KeystrokePacer.achieved_wpm: a burst's final interval is part of the session
+            rate_elapsed = max(elapsed, self.pacer.next_deadline - self.pacer.start_time)
+        def ms(seconds):
+            return round(seconds * 1000, 3) if seconds is not None else None
+        return {
+            'target_cps': round(self.target_cps, 2),
+            'achieved_cps': round((self.chars_typed + self.chars_pasted) / rate_elapsed, 2) if rate_elapsed > 0 else 0.0,
+            'elapsed_s': round(elapsed, 3),
+            'position': self.position,
+            'total_chars': self.total_chars,
+            'chars_typed': self.chars_typed,
+            'chars_pasted': self.chars_pasted,
+            'chars_skipped': self.start_offset, # Resumed over, never typed this session
+            'chars_remaining': self.total_chars - self.position if self.total_chars is not None else None,
+            'countdown_ms': ms(self.countdown_s),
+            'start_to_first_key_ms': ms(self.first_key_at - self.created if self.first_key_at else None),
+            'stop_latency_ms': ms(end - self.stop_requested_at if self.stop_requested_at and self.finished_at else None),
+            'longest_stall_ms': ms(self.longest_stall_s),
+            'batches': self.batches,
+            'mean_injection_latency_us': round(self.latency_total_s / self.batches * 1e6, 1) if self.batches else None,
+            'injection_latency_us': {'upper_bounds': list(INJECTION_LATENCY_BUCKETS_US) + [None],
+                                     'counts': list(self.latency_counts)},
+        }
+
+
+def write_session_record(summary, path=None):
+    """Appends a finished session's summary (with its metrics) as one JSON line."""
+    try:
+        path = path or os.path.join(user_data_dir(), SESSION_METRICS_FILENAME)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(dict(summary, finished=time.time())) + '\n')
+        return path
+    except OSError as e:
+        logging.error(f"Failed to write session metrics: {e}")
+        return None
+
+
+class MetricsServer:
+    """Serves live metrics as JSON on localhost (GET /metrics) from a daemon thread.
+
+    `provider` is called on the server thread for every request and must return a
+    JSON-serializable dict. Port 0 picks a free port (see `port`).
+    """
+
+    def __init__(self, provider, port=0):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer # Only needed when enabled
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = json.dumps(provider()).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass # Requests are not worth a line each in the app log
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def start(self):
+        self.thread.start()
+        logging.info(f"Metrics endpoint listening on http://127.0.0.1:{self.port}/metrics")
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _BatchText:
+    """The characters of a keystroke batch, rendered only when a trace record is formatted."""
+
+    __slots__ = ('chars', 'key_indices', 'start', 'end')
+
+    def __init__(self, chars, key_indices, start, end):
+        self.chars, self.key_indices, self.start, self.end = chars, key_indices, start, end
+
+    def __repr__(self):
+        return repr(''.join(self.chars[index] for index in self.key_indices[self.start:self.end]))
+
+
+# --- Typing Engine ---
+class TypingEngine:
+    """Headless typing engine: types text through a keyboard controller at a given rate.
+
+    Knows nothing about Tk; the GUI and the command line both drive it. `backend` is a
+    keyboard backend, or the name of one in KEYBOARD_BACKENDS to create when the first
+    session starts. Callbacks are
+    invoked from the typing thread:
+      on_status(text, color)          countdown and phase messages
+      on_progress(position, total, elapsed)
+                                      at most every PROGRESS_INTERVAL_S; `position` is the offset
+                                      reached in the source, total is None for streams
+      on_finish(summary)              once per session, with a summary dict
+      on_error(exception)             when the backend or clipboard fails
+    `clipboard` is optional and needs read() and write(text); without it the
+    clipboard-assisted mode falls back to typing. A clipboard with `tracks_reads` set also
+    has wait_read(since, timeout, stop_event), which returns when another application
+    last finished reading the written text, once that is at or after `since` (None on
+    timeout or stop); pastes then wait for the target instead of a fixed settle time. `synthetic_filter` is an optional
+    SyntheticEventFilter that is told about injected presses of watched keys.
+    """
+
+    def __init__(self, backend=DEFAULT_KEYBOARD_BACKEND, clipboard=None, on_status=None, on_progress=None,
+                 on_finish=None, on_error=None, synthetic_filter=None):
+        self.backend = backend
+        self._resolved_plan = None # Plan whose characters _resolved_keys holds the backend keys for
+        self._resolved_keys = None
+        self.clipboard = clipboard
+        self.synthetic_filter = synthetic_filter
+        self.on_status = on_status
+        self.on_progress = on_progress
+        self.on_finish = on_finish
+        self.on_error = on_error
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.pacer = None
+        self.metrics = None # SessionMetrics of the running (or last) session
+        self.total_chars = None
+        self.position = 0 # Offset (in characters) of the next character to type from the source
+        self.checkpoint = None
+        self._block_start = 0
+        self._last_progress = 0.0
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, source, wpm, burst_size=1, use_clipboard=False, unthrottled=False,
+              countdown=COUNTDOWN_SECONDS, start_offset=0, checkpoint=None, plan=None):
+        """Starts a session on a background thread. Returns False if one is already running."""
+        if self.running:
+            logging.warning("Typing engine start requested while a session is running.")
+            return False
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, args=(source, wpm, burst_size, use_clipboard, unthrottled,
+                                                              countdown, start_offset, checkpoint, plan),
+                                       name="RoboKeyboTyping", daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self):
+        """Signals the running session to stop; the typing thread finishes it."""
+        metrics = self.metrics
+        if self.running and metrics is not None and metrics.stop_requested_at is None:
+            metrics.stop_requested_at = time.perf_counter()
+        self.stop_event.set()
+
+    def live_metrics(self):
+        """Snapshot of the running (or last) session's metrics, or None before the first session."""
+        metrics = self.metrics
+        if metrics is None:
+            return None
+        if metrics.finished_at is None:
+            metrics.position = self.position
+        return metrics.snapshot()
+
+    def set_wpm(self, wpm):
+        """Changes the rate of the running session."""
+        if self.pacer is not None:
+            self.pacer.set_wpm(wpm)
+
+    def join(self, timeout=None):
+        """Waits for the running session to finish."""
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def close(self):
+        """Stops any running session and releases the keyboard backend once no more sessions will run.
+
+        The typing thread is joined first: it may be inside a burst that still uses the backend
+        (an XTest display, for example). If it does not finish in time the backend is left open.
+        """
+        if self.running:
+            self.stop()
+            self.join(ENGINE_STOP_TIMEOUT_S)
+            if self.running:
+                logging.warning("Typing thread did not stop in time; leaving the keyboard backend open.")
+                return
+        if not isinstance(self.backend, str):
+            self.backend.close()
+
+    def run(self, source, wpm, burst_size=1, use_clipboard=False, unthrottled=False,
+            countdown=COUNTDOWN_SECONDS, start_offset=0, checkpoint=None, plan=None):
+        """Types `source` (a str or a text stream) on the calling thread and returns the session summary.
+
+        Typing begins `start_offset` characters into the source. If `checkpoint` (a
+        SessionCheckpoint) is given, progress is saved to it as the session goes; it is
+        cleared when the source has been typed to the end.
+        A stream with a pause_after_block() method (CsvFormSource) is asked after every block
+        how long to wait before typing the next one. `plan` is an already compiled plan of a
+        str source (e.g. from the snippet cache), saving the plan cache lookup.
+        """
+        chunk_size = max(1, burst_size)
+        pacer = self.pacer = KeystrokePacer(wpm, self.stop_event, unthrottled=unthrottled)
+        self.total_chars = len(source) if isinstance(source, str) else None
+        self.position = start_offset
+        self.checkpoint = checkpoint
+        self.metrics = SessionMetrics(wpm, start_offset, self.total_chars)
+        summary = {'target_wpm': wpm, 'total_chars': self.total_chars, 'chars_typed': 0,
+                   'start_offset': start_offset, 'position': start_offset,
+                   'elapsed': 0.0, 'achieved_wpm': 0.0, 'rebases': 0, 'stopped': False, 'error': None}
+
+        logging.info(f"Starting autotype for {self.total_chars if self.total_chars is not None else 'streamed'} characters at "
+                     f"{'unthrottled' if unthrottled else f'{wpm} WPM'} "
+                     f"(interval: {pacer.interval:.4f}s/char, chunk size: {chunk_size}, clipboard-assisted: {use_clipboard}"
+                     f"{f', resuming at {start_offset}' if start_offset else ''}).")
+
+        if isinstance(self.backend, str):
+            try:
+                self.backend = create_keyboard_backend(self.backend)
+            except Exception as e:
+                logging.error(f"Could not create the {self.backend} keyboard backend: {e}")
+                summary['error'] = str(e)
+                if self.on_error:
+                    self.on_error(e)
+                return self._finish(summary, stopped=False)
+
+        # Check for stop event before starting countdown
+        if self.stop_event.is_set():
+            logging.info("Autotype cancelled before countdown due to stop event.")
+            return self._finish(summary, stopped=True)
+
+        # Countdown loop
+        countdown_start = time.perf_counter()
+        for i in range(countdown, 0, -1):
+            self._status(f"Typing in {i}...", "orange")
+            # Use wait instead of sleep, allowing immediate interruption
+            if self.stop_event.wait(1): # Wait for 1 second, or return True if event is set
+                logging.info(f"Autotype interrupted during countdown (via wait) at {i} seconds.")
+                if tracer is not None:
+                    tracer.complete("countdown", "typing", countdown_start, args={'stopped': True})
+                return self._finish(summary, stopped=True)
+        self.metrics.countdown_s = time.perf_counter() - countdown_start
+        if tracer is not None:
+            tracer.complete("countdown", "typing", countdown_start)
+
+        self._status("Typing...", "green")
+
+        completed = True
+        pacer.start()
+        self.metrics.typing_started = pacer.start_time
+        self.metrics.pacer = pacer
+        pause_after_block = getattr(source, 'pause_after_block', None)
+        try:
+            for text, plan, block_start in self._iter_blocks(source, start_offset, plan):
+                self._block_start = block_start
+                first = max(0, start_offset - block_start)
+                if use_clipboard and self.clipboard is not None:
+                    completed = self._type_with_clipboard(text, plan, first, chunk_size, pacer)
+                else:
+                    completed = self._type_segment(plan, first, len(plan), chunk_size, pacer)
+                if not completed:
+                    break
+                delay = pause_after_block() if pause_after_block is not None else 0.0
+                if delay:
+                    self._progress(pacer, force=True)
+                    pause_start = time.perf_counter()
+                    if wait_until(pause_start + delay, self.stop_event):
+                        completed = False
+                        break
+                    if tracer is not None:
+                        tracer.complete("record delay", "typing", pause_start)
+                    pacer.resync() # The pause is not lateness to catch up on
+        except Exception as e:
+            logging.error(f"Error during typing: {e}")
+            summary['error'] = str(e)
+            completed = False
+            if self.on_error:
+                self.on_error(e)
+
+        summary.update(chars_typed=pacer.chars_done, position=self.position, elapsed=pacer.elapsed(),
+                       achieved_wpm=pacer.achieved_wpm(), rebases=pacer.rebases)
+        logging.info(f"Typed {pacer.chars_done} characters, reaching {self.position}/"
+                     f"{self.total_chars if self.total_chars is not None else '?'} "
+                     f"in {summary['elapsed']:.2f}s: achieved {summary['achieved_wpm']:.1f} WPM "
+                     f"(target {wpm} WPM, {pacer.rebases} schedule rebases).")
+        if checkpoint is not None:
+            if completed or (self.total_chars is not None and self.position >= self.total_chars):
+                checkpoint.clear()
+            else:
+                checkpoint.save(self.position)
+        self._progress(pacer, force=True)
+        return self._finish(summary, stopped=not completed and summary['error'] is None)
+
+    def _finish(self, summary, stopped):
+        summary['stopped'] = stopped
+        self.metrics.position = self.position
+        self.metrics.finished_at = time.perf_counter()
+        summary['metrics'] = self.metrics.snapshot()
+        if tracer is not None:
+            tracer.complete("session", "typing", self.metrics.created, self.metrics.finished_at,
+                            {'position': self.position, 'stopped': stopped})
+        logging.info("Autotyping finished (or stopped forcefully).\n") # Added newline for clarity
+        if self.on_finish:
+            self.on_finish(summary)
+        return summary
+
+    def _status(self, text, color):
+        if self.on_status:
+            self.on_status(text, color)
+
+    def _progress(self, pacer, force=False):
+        if not self.on_progress:
+            return
+        now = time.perf_counter()
+        if force or now - self._last_progress >= PROGRESS_INTERVAL_S:
+            self._last_progress = now
+            self.on_progress(self.position, self.total_chars, pacer.elapsed())
+
+    def _advance(self, block_offset):
+        """Records that the current block has been typed up to `block_offset` and checkpoints it."""
+        self.position = self._block_start + block_offset
+        if self.checkpoint is not None:
+            self.checkpoint.maybe_save(self.position)
+
+    def _iter_blocks(self, source, start_offset=0, plan=None):
+        """Yields (text, plan, block_start) blocks. Strings use `plan` or the plan cache; streams
+        are compiled block by block, skipping the first `start_offset` characters."""
+        if isinstance(source, str):
+            yield source, plan or get_keystroke_plan(source), 0
+            return
+        block_start = 0
+        while block_start < start_offset:
+            skipped = source.read(min(STREAM_BLOCK_CHARS, start_offset - block_start))
+            if not skipped:
+                return
+            block_start += len(skipped)
+        for block in iter(lambda: source.read(STREAM_BLOCK_CHARS), ''):
+            yield block, compile_keystroke_plan(block), block_start
+            block_start += len(block)
+
+    def _type_segment(self, plan, start, end, chunk_size, pacer):
+        """Main typing loop over characters [start, end) of `plan`.
+
+        Returns False if typing was stopped, True once the range is typed.
+        """
+        press = self.backend.press
+        release = self.backend.release
+        flush = self.backend.flush
+        keys = self._backend_keys(plan)
+        chars = plan.chars
+        key_indices = plan.key_indices
+        # Indices of keys the hotkey listener must not mistake for physical presses
+        watched = self._watched_indices(plan)
+        record_batch = self.metrics.record_batch
+        perf_counter = time.perf_counter
+        trace = tracer
+        # The previous range left the wait after its last chunk to whatever is typed next
+        if pacer.wait():
+            logging.info("Autotype interrupted by stop event while pacing.")
+            return False
+        for chunk_start, chunk_end in iter_chunk_bounds(start, end, chunk_size):
+            # Check for stop event before each character (or burst)
+            if self.stop_event.is_set():
+                logging.info("Autotype interrupted by stop event during typing.")
+                return False
+            batch_start = perf_counter()
+            for index in key_indices[chunk_start:chunk_end]:
+                key = keys[index]
+                if index in watched:
+                    self.synthetic_filter.note_injected(chars[index])
+                press(key)
+                release(key)
+            flush()
+            batch_end = perf_counter()
+            # Lateness against the schedule only means something when pacing
+            lateness = 0.0 if pacer.unthrottled else batch_start - pacer.next_deadline
+            record_batch(chunk_end - chunk_start, batch_end - batch_start, lateness)
+            if _keystroke_trace:
+                # The arguments are only formatted on the log writer thread
+                keystroke_log.debug("keys %d-%d %r injected in %.1fus", self._block_start + chunk_start,
+                                    self._block_start + chunk_end, _BatchText(chars, key_indices, chunk_start, chunk_end),
+                                    (batch_end - batch_start) * 1e6)
+            self._advance(chunk_end)
+            pace_start = perf_counter() if trace is not None else 0.0
+            stopped = pacer.pace(chunk_end - chunk_start, wait=chunk_end < end)
+            if trace is not None:
+                trace.complete("keys", "typing", batch_start, batch_end,
+                               (('offset', self._block_start + chunk_start), ('chars', chunk_end - chunk_start),
+                                ('late_s', lateness)))
+                if not pacer.unthrottled:
+                    trace.complete("pace", "typing", pace_start)
+            if stopped:
+                logging.info("Autotype interrupted by stop event while pacing.")
+                return False
+            self._progress(pacer)
+        return True
+
+    def _backend_keys(self, plan):
+        """The backend's keys for the plan's characters, resolved once per plan."""
+        if self._resolved_plan is not plan:
+            self._resolved_keys = self.backend.resolve(plan.chars)
+            self._resolved_plan = plan
+        return self._resolved_keys
+
+    def _watched_indices(self, plan):
+        if self.synthetic_filter is None:
+            return frozenset()
+        return frozenset(index for index, char in enumerate(plan.chars) if self.synthetic_filter.watches(char))
+
+    def _type_with_clipboard(self, text, plan, first, chunk_size, pacer):
+        """Hybrid typing from `first` on: long runs are pasted through the clipboard, everything else is typed.
+
+        The user's clipboard is saved before the block and restored afterwards. When the
+        clipboard sees the target read each paste, the next one waits for that read and
+        the segment size follows how long it took.
+        """
+        segments = [(kind, max(start, first), end) for kind, start, end in split_for_clipboard(text) if end > first]
+        pasted_chars = sum(end - start for kind, start, end in segments if kind == 'paste')
+        logging.info(f"Clipboard-assisted typing: {len(segments)} segments, {pasted_chars}/{len(text) - first} characters via paste.")
+        if not pasted_chars:
+            return self._type_segment(plan, first, len(plan), chunk_size, pacer)
+
+        try:
+            saved_clipboard = self.clipboard.read()
+        except Exception as e:
+            logging.error(f"Could not save clipboard contents, falling back to typing: {e}")
+            return self._type_segment(plan, first, len(plan), chunk_size, pacer)
+
+        tracks_reads = getattr(self.clipboard, 'tracks_reads', False)
+        tuner = PasteSegmentTuner()
+        try:
+            for kind, start, end in segments:
+                if kind == 'type':
+                    if not self._type_segment(plan, start, end, chunk_size, pacer):
+                        return False
+                    continue
+                offset = start
+                while offset < end:
+                    if self.stop_event.is_set():
+                        logging.info("Autotype interrupted by stop event between paste segments.")
+                        return False
+                    segment = text[offset:min(offset + tuner.segment_size, end)]
+                    segment_start = time.perf_counter()
+                    self.clipboard.write(segment)
+                    sent = time.perf_counter()
+                    self._send_paste_chord()
+                    self.metrics.record_paste(len(segment))
+                    self._advance(offset + len(segment))
+                    # Leave the clipboard alone until the target has read it
+                    if tracks_reads:
+                        read_at = self.clipboard.wait_read(sent, CLIPBOARD_READ_TIMEOUT_S, self.stop_event)
+                        if read_at is None:
+                            if self.stop_event.is_set():
+                                return False
+                            self._advance(offset) # Resume retypes the segment the target never took
+                            raise OSError(f"The target did not read a {len(segment)}-character paste within "
+                                          f"{CLIPBOARD_READ_TIMEOUT_S:.0f}s; stopped at offset {self.position}.")
+                        tuner.record(len(segment), read_at - sent)
+                    elif wait_until(time.perf_counter() + paste_settle_time(len(segment)), self.stop_event):
+                        return False
+                    if tracer is not None:
+                        tracer.complete("paste", "typing", segment_start, args={'chars': len(segment)})
+                    pacer.resync(len(segment))
+                    offset += len(segment)
+                    self._progress(pacer)
+            logging.info("Clipboard-assisted typing finished"
+                         + (f" with a segment size of {tuner.segment_size} characters." if tracks_reads else "."))
+            return True
+        finally:
+            try:
+                self.clipboard.write(saved_clipboard)
+                logging.info("Original clipboard contents restored.")
+            except Exception as e:
+                logging.error(f"Failed to restore clipboard contents: {e}")
+
+    def _send_paste_chord(self):
+        if self.synthetic_filter is not None and self.synthetic_filter.watches('v'):
+            self.synthetic_filter.note_injected('v')
+        self.backend.send_paste()
+
+
+# --- Typing Process ---
+class _PipeSyntheticFilter:
+    """Typing-process side of the parent's SyntheticEventFilter.
+
+    Each injected press of a watched key is reported over the pipe, and the typing
+    thread waits for the parent's acknowledgement so the echo is expected before it exists.
+    """
+
+    def __init__(self, send, ack_event, identities):
+        self._send = send
+        self._ack = ack_event
+        self._identities = identities
+
+    def watches(self, key):
+        return key_identity(key) in self._identities
+
+    def note_injected(self, key):
+        self._ack.clear()
+        self._send('injected', key_identity(key))
+        self._ack.wait(SYNTHETIC_ECHO_TIMEOUT_S)
+
+
+def _typing_process_main(command_conn, event_conn, log_queue=None, log_level=DEFAULT_LOG_LEVEL, keystroke_trace=False,
+                         timeline=False):
+    """Entry point of the typing process: runs TypingEngine sessions as commanded over the pipes."""
+    import signal
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # Ctrl+C in a console is for the app, which sends 'stop'
+    if log_queue is not None:
+        # The app's writer thread owns the log file; two processes must not rotate it
+        log_to_queue(log_queue)
+        set_log_level(log_level)
+        set_keystroke_trace(keystroke_trace)
+    if timeline:
+        start_tracing() # Spans are sent to the app's tracer after each session
+    send_lock = threading.Lock()
+
+    def send(*message):
+        with send_lock:
+            event_conn.send(message)
+
+    def finish(summary):
+        if tracer is not None:
+            send('trace', *tracer.drain())
+        send('finish', summary)
+
+    ack = threading.Event()
+    engine = TypingEngine(on_status=lambda text, color: send('status', text, color),
+                          on_progress=lambda position, total, elapsed: send('progress', position, total, elapsed,
+                                                                           engine.live_metrics()),
+                          on_finish=finish,
+                          on_error=lambda error: send('error', str(error)))
+    while True:
+        try:
+            command, *args = command_conn.recv()
+        except EOFError:
+            break # The app went away
+        if command == 'start':
+            source, options, identities, backend_name = args
+            if getattr(engine.backend, 'name', engine.backend) != backend_name:
+                engine.close()
+                engine.backend = backend_name
+            if identities:
+                # The identities are the parent's pynput key codes; without pynput here
+                # (e.g. the xtest or recording backend) typed newlines and spaces would not match them
+                load_keyboard_modules()
+            engine.synthetic_filter = _PipeSyntheticFilter(send, ack, identities) if identities else None
+            engine.start(source, **options)
+        elif command == 'stop':
+            engine.stop()
+        elif command == 'rate':
+            engine.set_wpm(args[0])
+        elif command == 'ack':
+            ack.set()
+        elif command == 'quit':
+            break
+    engine.stop()
+    engine.join(PROCESS_STOP_TIMEOUT_S)
+    engine.close()
+
+
+class TypingProcess:
+    """Runs TypingEngine sessions in a child process, away from the GUI's GIL.
+
+    The Tk loop, the hotkey listener and the tray thread all hold the GIL at times, and
+    an in-process typing thread feels every one of them as a stall between keystrokes.
+    The child only types; this side sends start/stop/rate commands over one pipe and a
+    reader thread turns the child's messages on the other pipe into the same callbacks
+    TypingEngine makes. Only in-memory text can be typed, and the child has no clipboard
+    (clipboard-assisted mode types instead). The child is started on first use and reused.
+    """
+
+    def __init__(self, on_status=None, on_progress=None, on_finish=None, on_error=None, synthetic_filter=None,
+                 backend=DEFAULT_KEYBOARD_BACKEND):
+        self.backend = backend # Name of the keyboard backend the child creates
+        self.on_status = on_status
+        self.on_progress = on_progress
+        self.on_finish = on_finish
+        self.on_error = on_error
+        self.synthetic_filter = synthetic_filter
+        self.process = None
+        self._command_conn = None
+        self._send_lock = threading.Lock() # Commands come from the Tk thread and the reader thread
+        self._running = False
+        self._finished = threading.Event()
+        self._summary = None # Reported if the child dies mid-session
+        self._metrics = None # Latest metrics snapshot from the child
+        self._log_listener = None # Writes the child's log records to the app's log file
+
+    @property
+    def running(self):
+        return self._running
+
+    def live_metrics(self):
+        """The session metrics as of the child's last progress report (or the finished session's)."""
+        return self._metrics
+
+    def _ensure_process(self):
+        if self.process is not None and self.process.is_alive():
+            return
+        import multiprocessing # Only needed when the typing process is used
+        # spawn, not fork: the parent has Tk, X connections and listener threads that must not be copied
+        context = multiprocessing.get_context('spawn')
+        command_recv, command_send = context.Pipe(duplex=False)
+        event_recv, event_send = context.Pipe(duplex=False)
+        spawn_start = time.perf_counter()
+        log_queue = None
+        if _log_handler is not None:
+            log_queue = context.Queue()
+            self._log_listener = start_log_listener(log_queue)
+        self.process = context.Process(target=_typing_process_main,
+                                       args=(command_recv, event_send, log_queue,
+                                             logging.getLevelName(logging.getLogger().level), _keystroke_trace,
+                                             tracer is not None),
+                                       name="RoboKeyboTyping", daemon=True)
+        self.process.start()
+        # Closing the child's ends here lets the reader see EOF if the child dies
+        command_recv.close()
+        event_send.close()
+        self._command_conn = command_send
+        threading.Thread(target=self._read_events, args=(event_recv,), daemon=True).start()
+        logging.info(f"Typing process {self.process.pid} started in {(time.perf_counter() - spawn_start) * 1000:.1f}ms.")
+        if tracer is not None:
+            tracer.complete("spawn typing process", "process", spawn_start)
+
+    def _send(self, *message):
+        with self._send_lock:
+            self._command_conn.send(message)
+
+    def start(self, source, wpm, burst_size=1, use_clipboard=False, unthrottled=False,
+              countdown=COUNTDOWN_SECONDS, start_offset=0, checkpoint=None, plan=None):
+        """Starts a session in the typing process. Returns False if one is already running.
+
+        `plan` is accepted for symmetry with TypingEngine; the typing process compiles its own.
+        """
+        if self.running:
+            logging.warning("Typing process start requested while a session is running.")
+            return False
+        if not isinstance(source, str):
+            raise TypeError("The typing process only types in-memory text.")
+        self._ensure_process()
+        identities = self.synthetic_filter.reported_identities if self.synthetic_filter is not None else frozenset()
+        self._summary = {'target_wpm': wpm, 'total_chars': len(source), 'chars_typed': 0,
+                         'start_offset': start_offset, 'position': start_offset,
+                         'elapsed': 0.0, 'achieved_wpm': 0.0, 'rebases': 0, 'stopped': False, 'error': None}
+        self._running = True
+        self._metrics = None
+        self._finished.clear()
+        self._send('start', source, dict(wpm=wpm, burst_size=burst_size, use_clipboard=use_clipboard,
+                                         unthrottled=unthrottled, countdown=countdown,
+                                         start_offset=start_offset, checkpoint=checkpoint), identities, self.backend)
+        return True
+
+    def stop(self):
+        if self._running:
+            self._send('stop')
+
+    def set_wpm(self, wpm):
+        if self._running:
+            self._send('rate', wpm)
+
+    def join(self, timeout=None):
+        """Waits for the running session to finish."""
+        if self._running:
+            self._finished.wait(timeout)
+
+    def close(self):
+        """Stops the typing process (at app exit)."""
+        if self.process is None:
+            return
+        try:
+            self._send('quit')
+        except OSError:
+            pass # Already gone
+        self.process.join(PROCESS_STOP_TIMEOUT_S)
+        if self.process.is_alive():
+            logging.warning("Typing process did not exit in time; terminating it.")
+            self.process.terminate()
+        self.process = None
+        if self._log_listener is not None:
+            self._log_listener.stop()
+            self._log_listener = None
+
+    def _read_events(self, conn):
+        """Reader thread: turns the typing process's messages into callbacks."""
+        while True:
+            try:
+                kind, *args = conn.recv()
+            except (EOFError, OSError):
+                break
+            if kind == 'injected':
+                if self.synthetic_filter is not None:
+                    self.synthetic_filter.note_injected(args[0])
+                self._send('ack')
+            elif kind == 'progress':
+                *progress, self._metrics = args
+                self._summary['position'] = progress[0]
+                if self.on_progress:
+                    self.on_progress(*progress)
+            elif kind == 'status':
+                if self.on_status:
+                    self.on_status(*args)
+            elif kind == 'error':
+                if self.on_error:
+                    self.on_error(RuntimeError(args[0]))
+            elif kind == 'trace':
+                if tracer is not None:
+                    tracer.merge(*args)
+            elif kind == 'finish':
+                self._metrics = args[0].get('metrics', self._metrics)
+                self._running = False
+                if self.on_finish:
+                    self.on_finish(args[0])
+                self._finished.set()
+        conn.close()
+        if self._running:
+            # The child died mid-session; finish it here so the caller is not left waiting
+            logging.error("Typing process exited unexpectedly.")
+            self._running = False
+            self._summary['error'] = "The typing process exited unexpectedly."
+            if self._metrics is None: # It died before its first progress report
+                summary = self._summary
+                self._metrics = SessionMetrics(summary['target_wpm'], summary['start_offset'],
+                                               summary['total_chars']).snapshot()
+            self._summary['metrics'] = self._metrics
+            if self.on_error:
+                self.on_error(RuntimeError(self._summary['error']))
+            if self.on_finish:
+                self.on_finish(self._summary)
+            self._finished.set()
+
+
+# --- GUI ---
+class UiUpdateChannel:
+    """One-way channel from worker threads (typing, hotkey listener, tray) to the Tk main thread.
+
+    Workers only append to a deque, which is atomic and never touches Tcl; the GUI drains
+    it from a single after() poller. Progress updates overwrite each other, so a session
+    produces at most one progress redraw per frame however fast it types.
+    """
+
+    def __init__(self):
+        self._calls = deque()
+        self._progress = None
+
+    def post(self, func, *args):
+        """Queues func(*args) to run on the Tk main thread, in order."""
+        self._calls.append((func, args))
+
+    def post_progress(self, *progress):
+        """Replaces the pending progress update; only the latest one is rendered."""
+        self._progress = progress
+
+    def drain(self):
+        """Returns the queued calls and the latest progress (or None). Tk main thread only."""
+        calls = []
+        while self._calls:
+            calls.append(self._calls.popleft())
+        progress, self._progress = self._progress, None
+        return calls, progress
+
+
+class TkClipboard:
+    """Clipboard access for the typing engine, marshalled onto the Tk main thread.
+
+    On X11 the text is served through a CLIPBOARD selection handler, so the moment the
+    target has fetched all of a paste is known (`tracks_reads`, see wait_read()).
+    """
+
+    def __init__(self, master, channel, timeout=5.0):
+        self.master = master
+        self.channel = channel
+        self.timeout = timeout
+        self.tracks_reads = master.tk.call('tk', 'windowingsystem') == 'x11'
+        self._text = ""
+        self._handler_registered = False
+        self._read_done = threading.Condition()
+        self._last_read = float('-inf') # perf_counter() when a request last reached the end of the text
+
+    def read(self):
+        """Returns the clipboard text, or None if it is empty or holds non-text data."""
+        return self._call_in_ui_thread(self._read)
+
+    def write(self, text):
+        self._call_in_ui_thread(lambda: self._write(text))
+
+    def _read(self):
+        try:
+            return self.master.clipboard_get()
+        except tk.TclError:
+            return None
+
+    def wait_read(self, since, timeout, stop_event):
+        """Waits for another application to finish reading the text at or after `since`.
+
+        Returns the perf_counter() time of that read, or None on timeout or when `stop_event` is set.
+        """
+        deadline = time.perf_counter() + timeout
+        with self._read_done:
+            while self._last_read < since:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0 or stop_event.is_set():
+                    return None
+                self._read_done.wait(min(remaining, 0.05))
+            return self._last_read
+
+    def _write(self, text):
+        self.master.clipboard_clear()
+        if text is None:
+            return
+        if not self.tracks_reads:
+            self.master.clipboard_append(text)
+            return
+        if not self._handler_registered:
+            for selection_type in ('UTF8_STRING', 'STRING'):
+                self.master.selection_handle(self._serve, selection='CLIPBOARD', type=selection_type)
+            self._handler_registered = True
+        self._text = text
+        self.master.selection_own(selection='CLIPBOARD')
+
+    def _serve(self, offset, max_chars):
+        """Selection handler: returns the requested piece of the text. Tk main thread."""
+        offset, max_chars = int(offset), int(max_chars)
+        if offset + max_chars >= len(self._text):
+            with self._read_done:
+                self._last_read = time.perf_counter()
+                self._read_done.notify_all()
+        return self._text[offset:offset + max_chars]
 
+    def _call_in_ui_thread(self, func):
+        """Runs `func` on the Tk main thread and returns its result; Tk calls are not thread-safe."""
+        done = threading.Event()
+        result = {}
 
+        def runner():
+            try:
+                result['value'] = func()
+            except Exception as e:
+                result['error'] = e
+            finally:
+                done.set()
 
+        self.channel.post(runner)
+        if not done.wait(self.timeout):
+            raise TimeoutError("Timed out waiting for the Tk main thread.")
+        if 'error' in result:
+            raise result['error']
+        return result.get('value')
 
-# --- Configuration ---
-DEFAULT_WPM = 120
-MIN_WPM = 10
-MAX_WPM = 300
-DEFAULT_HOTKEY_STR = 'z'
 
 class AutoTypeApp:
-    def __init__(self, master):
+    def __init__(self, master, backend=DEFAULT_KEYBOARD_BACKEND, metrics_port=None):
         self.master = master
+        self.backend = backend # Keyboard backend name for both typing engines
+        self.metrics_port = metrics_port # Serve live metrics on this localhost port when set
+        self.metrics_server = None
+        self._last_session = None # Summary (with metrics) of the last finished session
         self.master.title("RoboKeybo")
-        self.master.geometry("500x450")
+        self.master.geometry("500x705")
         self.master.resizable(False, False)
 
         try:
@@ -78,23 +2454,62 @@ class AutoTypeApp:
           logging.warning(f"Could not set title bar icon: {e}. Ensure 'icon.png' exists and is a valid PNG.")
 
         self.autotype_text = ""
+        self.autotype_plan = None
+        self.autotype_hash = None # Checkpoint key of the armed text or file
+        self.autotype_file = None # When set, typing streams this file instead of the text box
+        self.autotype_stream = None # Path of the armed file while it is streamed; None when the armed text is in memory
+        self.autotype_csv_header = None # Not None while autotype_file is a CSV form fill; True skips row one
+        self.autotype_form = None # (field key, record key, record delay, skip header) while a form fill is armed
+        self.snippets = None # SnippetStore, opened once the window is on screen
+        self._snippet_session = None # Name of the snippet being typed, if the session is one
+        self.large_document = None # A large paste shown as a read-only preview instead of the text box contents
+        self._large_text_generation = 0 # Discards a load that was cleared or superseded while running
+        self._large_text_loading = False
+        self._preview_first_line = 0
+        self._preview_rendered = 0
+        self._active_source = None
         self.autotype_enabled = False
         self.typing_active = False
-        # Event to signal a stop to the typing thread
-        self.typing_stop_event = threading.Event() 
+        self.resume_offset = 0 # Where the next hotkey press starts typing; non-zero while paused
+        self.countdown_seconds = COUNTDOWN_SECONDS # Before a hotkey-started session types (resumes use RESUME_COUNTDOWN_SECONDS)
+        self._session_start_offset = 0
 
         self.current_hotkey = DEFAULT_HOTKEY_STR
-        self.keyboard_controller = Controller()
-        self.pynput_listener = None
+        # Worker threads never touch Tk; everything they report goes through this channel.
+        self.ui_channel = UiUpdateChannel()
+        # Keeps the app's own keystrokes from triggering (or stopping on) the hotkey
+        self.synthetic_filter = SyntheticEventFilter()
+        self._listener_stats_at_start = None
+        self.thread_engine = TypingEngine(backend=self.backend, clipboard=TkClipboard(self.master, self.ui_channel),
+                                          on_status=self._on_engine_status, on_progress=self._on_engine_progress,
+                                          on_finish=self._on_engine_finish, on_error=self._on_engine_error,
+                                          synthetic_filter=self.synthetic_filter)
+        self.process_engine = None # TypingProcess, created the first time the option is used
+        self.engine = self.thread_engine # Whichever engine runs (or last ran) a session
+        self.hotkey_dispatcher = HotkeyDispatcher(self.synthetic_filter)
         
-        # Tray icon and thread will be created/destroyed as needed
+        # Tray icon and thread are created on the first minimize and live until exit
         self.tray_icon = None
         self.tray_thread = None
         self.tray_thread_is_stopped = threading.Event() # Set when tray thread has exited its loop
+        self.tray_icon_wanted = False # True while the window is minimized to the tray
+        self._tray_icon_image = None
 
         self.create_widgets()
         self.setup_window_protocols()
+        mark_startup("window built")
+        self.master.after(UI_FRAME_INTERVAL_MS, self._poll_ui_channel)
+        # pynput and the hotkey listener are brought up once the window is on screen.
+        self.master.after_idle(self._finish_startup)
+
+    def _finish_startup(self):
+        self._open_snippet_store() # Before the listener, so the snippet hotkeys are bound from the start
+        load_keyboard_modules()
         self.start_hotkey_listener()
+        if self.metrics_port is not None:
+            self._start_metrics_server()
+        mark_startup("startup complete")
+        logging.info(f"Startup timing: {startup_report()}.")
 
     def create_widgets(self):
         main_frame = tk.Frame(self.master, padx=15, pady=15)
@@ -104,7 +2519,67 @@ class AutoTypeApp:
         
         self.text_entry = scrolledtext.ScrolledText(main_frame, height=8, wrap=tk.WORD, font=("Inter", 10),
                                                    relief=tk.RIDGE, bd=2)
-        self.text_entry.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
+        self.text_entry.pack(fill=tk.BOTH, expand=True, pady=(0, 5))
+        self.text_entry.bind("<<Paste>>", self._on_text_paste)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.text_entry.bind(sequence, self._on_preview_wheel)
+
+        # --- Large Files (streamed, never loaded into the text box) ---
+        file_frame = tk.Frame(main_frame)
+        file_frame.pack(fill=tk.X, pady=(0, 10))
+        self.load_file_button = tk.Button(file_frame, text="Type from File...", command=self.choose_text_file,
+                                          font=("Inter", 9), cursor="hand2")
+        self.load_file_button.pack(side=tk.LEFT)
+        self.clear_file_button = tk.Button(file_frame, text="Clear", command=self.clear_text_source,
+                                           font=("Inter", 9), cursor="hand2", state=tk.DISABLED)
+        self.clear_file_button.pack(side=tk.RIGHT)
+        self.file_label = tk.Label(file_frame, text="No file (typing the text above)", fg="gray", font=("Inter", 8))
+        self.file_label.pack(side=tk.LEFT, padx=(5, 0))
+
+        # --- Batch Form Fill (CSV rows typed as records) ---
+        form_frame = tk.Frame(main_frame)
+        form_frame.pack(fill=tk.X, pady=(0, 10))
+        self.load_csv_button = tk.Button(form_frame, text="Form Fill from CSV...", command=self.choose_csv_file,
+                                         font=("Inter", 9), cursor="hand2")
+        self.load_csv_button.pack(side=tk.LEFT)
+        self.record_delay_spinbox = tk.Spinbox(form_frame, from_=0, to=MAX_RECORD_DELAY_S, increment=0.5, width=4,
+                                               font=("Inter", 9))
+        self.record_delay_spinbox.delete(0, tk.END)
+        self.record_delay_spinbox.insert(0, str(DEFAULT_RECORD_DELAY_S))
+        self.record_delay_spinbox.pack(side=tk.RIGHT)
+        tk.Label(form_frame, text="Delay (s):", font=("Inter", 9)).pack(side=tk.RIGHT, padx=(5, 2))
+        self.record_key_var = tk.StringVar(value=DEFAULT_RECORD_KEY)
+        self.record_key_menu = tk.OptionMenu(form_frame, self.record_key_var, *FORM_FILL_KEYS)
+        self.record_key_menu.config(font=("Inter", 8), width=5)
+        self.record_key_menu.pack(side=tk.RIGHT)
+        tk.Label(form_frame, text="Record:", font=("Inter", 9)).pack(side=tk.RIGHT, padx=(5, 2))
+        self.field_key_var = tk.StringVar(value=DEFAULT_FIELD_KEY)
+        self.field_key_menu = tk.OptionMenu(form_frame, self.field_key_var, *FORM_FILL_KEYS)
+        self.field_key_menu.config(font=("Inter", 8), width=5)
+        self.field_key_menu.pack(side=tk.RIGHT)
+        tk.Label(form_frame, text="Field:", font=("Inter", 9)).pack(side=tk.RIGHT, padx=(5, 2))
+
+        # --- Snippet Library (named texts with their own hotkeys) ---
+        snippet_frame = tk.Frame(main_frame)
+        snippet_frame.pack(fill=tk.X, pady=(0, 10))
+        tk.Label(snippet_frame, text="Snippet:", font=("Inter", 10, "bold")).pack(side=tk.LEFT)
+        self.snippet_tag_var = tk.StringVar(value=ALL_SNIPPETS_TAG)
+        self.snippet_tag_menu = tk.OptionMenu(snippet_frame, self.snippet_tag_var, ALL_SNIPPETS_TAG)
+        self.snippet_tag_menu.config(font=("Inter", 8), width=8)
+        self.snippet_tag_menu.pack(side=tk.LEFT, padx=(5, 0))
+        self.snippet_var = tk.StringVar(value="")
+        self.snippet_menu = tk.OptionMenu(snippet_frame, self.snippet_var, "")
+        self.snippet_menu.config(font=("Inter", 8), width=12)
+        self.snippet_menu.pack(side=tk.LEFT)
+        self.delete_snippet_button = tk.Button(snippet_frame, text="Delete", command=self.delete_snippet,
+                                               font=("Inter", 9), cursor="hand2")
+        self.delete_snippet_button.pack(side=tk.RIGHT)
+        self.save_snippet_button = tk.Button(snippet_frame, text="Save...", command=self.open_snippet_dialog,
+                                             font=("Inter", 9), cursor="hand2")
+        self.save_snippet_button.pack(side=tk.RIGHT, padx=(0, 5))
+        self.use_snippet_button = tk.Button(snippet_frame, text="Use", command=self.use_snippet,
+                                            font=("Inter", 9), cursor="hand2")
+        self.use_snippet_button.pack(side=tk.RIGHT, padx=(0, 5))
 
         speed_frame = tk.Frame(main_frame)
         speed_frame.pack(fill=tk.X, pady=(0, 10))
@@ -116,6 +2591,40 @@ class AutoTypeApp:
         self.wpm_label = tk.Label(speed_frame, text=f"{self.wpm_slider.get()} WPM", font=("Inter", 9))
         self.wpm_label.pack(side=tk.RIGHT, padx=(5, 0))
 
+        # --- Burst Mode (batched injection) ---
+        burst_frame = tk.Frame(main_frame)
+        burst_frame.pack(fill=tk.X, pady=(0, 10))
+        self.burst_mode_var = tk.BooleanVar(value=False)
+        self.burst_mode_check = tk.Checkbutton(burst_frame, text="Burst mode (max speed = unthrottled)",
+                                               variable=self.burst_mode_var, font=("Inter", 10, "bold"))
+        self.burst_mode_check.pack(side=tk.LEFT)
+        self.burst_size_spinbox = tk.Spinbox(burst_frame, from_=MIN_BURST_SIZE, to=MAX_BURST_SIZE, width=6,
+                                             font=("Inter", 10))
+        self.burst_size_spinbox.delete(0, tk.END)
+        self.burst_size_spinbox.insert(0, str(DEFAULT_BURST_SIZE))
+        self.burst_size_spinbox.pack(side=tk.RIGHT)
+        tk.Label(burst_frame, text="Chars per burst:", font=("Inter", 9)).pack(side=tk.RIGHT, padx=(0, 5))
+
+        # --- Clipboard-assisted Mode (very long texts) ---
+        self.clipboard_mode_var = tk.BooleanVar(value=False)
+        self.clipboard_mode_check = tk.Checkbutton(main_frame, text="Clipboard-assisted (paste long segments)",
+                                                   variable=self.clipboard_mode_var, font=("Inter", 10, "bold"))
+        self.clipboard_mode_check.pack(anchor=tk.W, pady=(0, 10))
+
+        # --- Editor Targets (auto-indent / auto-close) ---
+        editor_frame = tk.Frame(main_frame)
+        editor_frame.pack(fill=tk.X, pady=(0, 10))
+        tk.Label(editor_frame, text="Editor target:", font=("Inter", 10, "bold")).pack(side=tk.LEFT)
+        self.editor_target_var = StringVar(value=DEFAULT_EDITOR_TARGET)
+        self.editor_target_menu = tk.OptionMenu(editor_frame, self.editor_target_var, *EDITOR_TARGETS)
+        self.editor_target_menu.pack(side=tk.LEFT, padx=(5, 0))
+
+        # --- Typing Process (steadier timing) ---
+        self.process_mode_var = tk.BooleanVar(value=False)
+        self.process_mode_check = tk.Checkbutton(main_frame, text="Type in a separate process (steadier timing)",
+                                                 variable=self.process_mode_var, font=("Inter", 10, "bold"))
+        self.process_mode_check.pack(anchor=tk.W, pady=(0, 10))
+
         # --- Hotkey Assignment (Modified) ---
         hotkey_frame = tk.Frame(main_frame)
         hotkey_frame.pack(fill=tk.X, pady=(0, 10))
@@ -145,6 +2654,8 @@ class AutoTypeApp:
 
         self.status_label = tk.Label(main_frame, text="Ready.", fg="gray", font=("Inter", 9))
         self.status_label.pack(pady=(0, 5))
+        self.progress_label = tk.Label(main_frame, text="", fg="gray", font=("Inter", 8))
+        self.progress_label.pack()
 
         developer_frame = tk.Frame(self.master, pady=5)
         developer_frame.pack(side=tk.BOTTOM, fill=tk.X)
@@ -152,10 +2663,353 @@ class AutoTypeApp:
         self.dev_label.pack(side=tk.LEFT, padx=(15, 0))
         self.dev_website_link = tk.Label(developer_frame, text="Source Code", fg="blue", cursor="hand2", font=("Inter", 8, "underline"))
         self.dev_website_link.pack(side=tk.LEFT)
-        self.dev_website_link.bind("<Button-1>", lambda e: webbrowser.open_new("https://github.com/GitHubUser331/RoboKeybo"))
+        self.dev_website_link.bind("<Button-1>", self.open_source_link)
+
+    def choose_text_file(self):
+        path = filedialog.askopenfilename(title="Choose a text file to autotype",
+                                          filetypes=[("Text files", "*.txt"), ("All files", "*.*")])
+        if not path:
+            return
+        self.clear_text_source()
+        try:
+            size = os.path.getsize(path)
+        except OSError as e:
+            messagebox.showerror("File Error", f"Could not open the file.\nError: {e}")
+            return
+        self.autotype_file = path
+        self.file_label.config(text=f"{os.path.basename(path)} ({size / 1048576:.1f} MB)", fg="blue")
+        self.text_entry.config(state=tk.DISABLED)
+        self.clear_file_button.config(state=tk.NORMAL)
+        logging.info(f"Typing source set to file {path} ({size} bytes).")
+
+    def choose_csv_file(self):
+        path = filedialog.askopenfilename(title="Choose a CSV file to fill forms from",
+                                          filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+        if not path:
+            return
+        self.clear_text_source()
+        skip_header = messagebox.askyesno("Form Fill", "Does the first row hold column names?\n"
+                                                       "If so, it is skipped instead of typed.")
+        try:
+            with CsvFormSource(path, skip_header=skip_header) as source:
+                rows = source.count_rows()
+        except (OSError, csv.Error) as e:
+            messagebox.showerror("File Error", f"Could not read the CSV file.\nError: {e}")
+            return
+        self.autotype_file = path
+        self.autotype_csv_header = skip_header
+        self.file_label.config(text=f"{os.path.basename(path)} (form fill, {rows:,} records)", fg="blue")
+        self.text_entry.config(state=tk.DISABLED)
+        self.clear_file_button.config(state=tk.NORMAL)
+        logging.info(f"Typing source set to form fill from {path} ({rows} records).")
+
+    def clear_text_source(self):
+        """Drops a chosen file or a large paste and goes back to typing the text box."""
+        self._disarm_autotype("the typing source changed")
+        self.autotype_file = None
+        self.autotype_csv_header = None
+        if self.large_document is not None or self._large_text_loading:
+            self.large_document = None
+            self._large_text_generation += 1
+            self._large_text_loading = False
+            self.text_entry.config(state=tk.NORMAL, yscrollcommand=self.text_entry.vbar.set)
+            self.text_entry.vbar.config(command=self.text_entry.yview)
+            self.text_entry.delete("1.0", tk.END)
+        self.file_label.config(text="No file (typing the text above)", fg="gray")
+        self.text_entry.config(state=tk.NORMAL)
+        self.clear_file_button.config(state=tk.DISABLED)
+        logging.info("Typing source set back to the text box.")
+
+    def _disarm_autotype(self, reason):
+        """Deactivates armed (or paused) autotype, so its offset and checkpoint key are never applied to another source."""
+        if not self.autotype_enabled or self.typing_active:
+            return
+        self.autotype_enabled = False
+        self.update_autotype_button_state()
+        self.autotype_stream = None
+        self.autotype_form = None
+        self.autotype_hash = None
+        self.resume_offset = 0
+        self.status_label.config(text=f"Autotype DISABLED: {reason}. Click button to ENABLE.", fg="red")
+        logging.info(f"Autotype disabled: {reason}.")
+
+    # --- Snippet Library ---
+    def _open_snippet_store(self):
+        """Opens the snippet library; only its index is read here."""
+        try:
+            self.snippets = SnippetStore()
+        except Exception as e:
+            logging.error(f"Snippet library unavailable: {e}")
+            for button in (self.use_snippet_button, self.save_snippet_button, self.delete_snippet_button):
+                button.config(state=tk.DISABLED)
+            return
+        self._refresh_snippet_menus()
+
+    def _close_snippet_store(self):
+        if self.snippets is not None:
+            self.snippets.close()
+            self.snippets = None
+
+    def _refresh_snippet_menus(self):
+        """Rebuilds the tag filter and snippet menus from the index."""
+        tags = [ALL_SNIPPETS_TAG] + self.snippets.tags()
+        if self.snippet_tag_var.get() not in tags:
+            self.snippet_tag_var.set(ALL_SNIPPETS_TAG)
+        tag_menu = self.snippet_tag_menu['menu']
+        tag_menu.delete(0, tk.END)
+        for tag in tags:
+            tag_menu.add_command(label=tag, command=functools.partial(self._select_snippet_tag, tag))
+        tag = self.snippet_tag_var.get()
+        names = self.snippets.names(None if tag == ALL_SNIPPETS_TAG else tag)
+        name_menu = self.snippet_menu['menu']
+        name_menu.delete(0, tk.END)
+        for name in names:
+            hotkey = self.snippets.index[name].hotkey
+            name_menu.add_command(label=f"{name} ({hotkey})" if hotkey else name,
+                                  command=functools.partial(self.snippet_var.set, name))
+        if self.snippet_var.get() not in names:
+            self.snippet_var.set(names[0] if names else "")
+
+    def _select_snippet_tag(self, tag):
+        self.snippet_tag_var.set(tag)
+        self._refresh_snippet_menus()
+
+    def _snippets_changed(self):
+        self._refresh_snippet_menus()
+        try:
+            self.apply_hotkey_bindings()
+        except Exception as e:
+            logging.error(f"Failed to update hotkey bindings: {e}")
+
+    def use_snippet(self):
+        """Puts the selected snippet in the text box (and its speed on the slider) to edit or arm it."""
+        name = self.snippet_var.get()
+        if self.snippets is None or name not in self.snippets.index:
+            return
+        try:
+            body, _ = self.snippets.load(name)
+        except Exception as e:
+            messagebox.showerror("Snippet Error", f"Could not load the snippet.\nError: {e}")
+            return
+        self.clear_text_source()
+        if len(body) >= LARGE_TEXT_CHARS:
+            self._load_large_text(body)
+        else:
+            self.text_entry.delete("1.0", tk.END)
+            self.text_entry.insert("1.0", body)
+        if self.snippets.index[name].wpm:
+            self.wpm_slider.set(self.snippets.index[name].wpm)
+        logging.info(f"Snippet '{name}' loaded into the text box.")
+
+    def delete_snippet(self):
+        name = self.snippet_var.get()
+        if self.snippets is None or name not in self.snippets.index:
+            return
+        if not messagebox.askyesno("Delete Snippet", f"Delete the snippet '{name}'?"):
+            return
+        try:
+            self.snippets.delete(name)
+        except Exception as e:
+            messagebox.showerror("Snippet Error", f"Could not delete the snippet.\nError: {e}")
+            return
+        self._snippets_changed()
+
+    def open_snippet_dialog(self):
+        """Saves the text box as a snippet, asking for its name, tags, hotkey and speed."""
+        if self.snippets is None:
+            return
+        if self.autotype_file is not None or self._large_text_loading:
+            messagebox.showwarning("Save Snippet", "Snippets are saved from the text box; clear the file first.")
+            return
+        body = self.large_document.text if self.large_document is not None else self.text_entry.get("1.0", tk.END).strip()
+        if not body:
+            messagebox.showwarning("Save Snippet", "Enter the snippet's text in the text box first.")
+            return
+        current = self.snippets.index.get(self.snippet_var.get())
+        dialog = tk.Toplevel(self.master)
+        dialog.title("Save Snippet")
+        dialog.transient(self.master)
+        dialog.resizable(False, False)
+        fields = {}
+        initial = {'Name:': current.name if current else "", 'Tags:': ' '.join(current.tags) if current else "",
+                   'Hotkey:': current.hotkey or "" if current else "", 'WPM:': current.wpm or "" if current else ""}
+        for row, (label, value) in enumerate(initial.items()):
+            tk.Label(dialog, text=label, font=("Inter", 9)).grid(row=row, column=0, sticky=tk.W, padx=(10, 5), pady=2)
+            fields[label] = tk.StringVar(value=value)
+            tk.Entry(dialog, textvariable=fields[label], width=30, font=("Inter", 9)).grid(row=row, column=1,
+                                                                                           padx=(0, 10), pady=2)
+        tk.Label(dialog, text="Separate tags with spaces. Leave Hotkey or WPM empty for none.", fg="gray",
+                 font=("Inter", 8)).grid(row=len(initial), column=0, columnspan=2, padx=10)
+
+        def save():
+            name, hotkey, wpm = fields['Name:'].get().strip(), fields['Hotkey:'].get().strip().lower(), None
+            if hotkey and (not self.is_valid_single_hotkey(hotkey) or hotkey == self.current_hotkey):
+                messagebox.showwarning("Invalid Hotkey", f"Use a single key other than {self.current_hotkey} "
+                                                         "(e.g. 'f8'), or leave the hotkey empty.", parent=dialog)
+                return
+            if fields['WPM:'].get().strip():
+                try:
+                    wpm = int(fields['WPM:'].get())
+                except ValueError:
+                    wpm = 0
+                if not MIN_WPM <= wpm <= MAX_WPM:
+                    messagebox.showwarning("Invalid Speed", f"Enter a speed from {MIN_WPM} to {MAX_WPM} WPM, "
+                                                            "or leave it empty.", parent=dialog)
+                    return
+            try:
+                self.snippets.save(name, body, fields['Tags:'].get().split(), hotkey or None, wpm)
+            except ValueError as e:
+                messagebox.showwarning("Save Snippet", str(e), parent=dialog)
+                return
+            except Exception as e:
+                messagebox.showerror("Snippet Error", f"Could not save the snippet.\nError: {e}", parent=dialog)
+                return
+            dialog.destroy()
+            self.snippet_var.set(name)
+            self._snippets_changed()
+            self._set_status(f"Snippet '{name}' saved.", "darkgreen")
+
+        button_frame = tk.Frame(dialog)
+        button_frame.grid(row=len(initial) + 1, column=0, columnspan=2, pady=(5, 10))
+        tk.Button(button_frame, text="Save", command=save, font=("Inter", 9), width=8).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Cancel", command=dialog.destroy, font=("Inter", 9), width=8).pack(side=tk.LEFT)
+        dialog.grab_set()
+
+    def _snippet_hotkey(self, name):
+        # Runs on the pynput listener thread, like hotkey_callback.
+        self.ui_channel.post(self._start_snippet, name)
+
+    def _start_snippet(self, name):
+        """Types snippet `name` right away, at its own speed (or the slider's)."""
+        if self.typing_active or self.snippets is None or name not in self.snippets.index:
+            return # A session is running, or the snippet was deleted meanwhile
+        try:
+            body, plan = self.snippets.load(name)
+        except Exception as e:
+            logging.error(f"Could not load snippet '{name}': {e}")
+            self._set_status(f"Could not load snippet '{name}'.", "red")
+            return
+        wpm = self.snippets.index[name].wpm or self.wpm_slider.get()
+        chunk_size = self._get_burst_size() if self.burst_mode_var.get() else 1
+        self.typing_active = True
+        self._snippet_session = name
+        self._disable_input_controls()
+        self._listener_stats_at_start = self.synthetic_filter.snapshot()
+        self._session_start_offset = 0
+        self.engine = self._choose_engine(body)
+        self.engine.start(body, wpm, burst_size=chunk_size, use_clipboard=self.clipboard_mode_var.get(),
+                          unthrottled=chunk_size > 1 and wpm >= MAX_WPM, countdown=0, plan=plan)
+        self._set_status(f"Typing snippet '{name}'... Press {self.current_hotkey} to STOP.", "green")
+        logging.info(f"Snippet '{name}' started by hotkey.")
+
+    # --- Large Pastes (virtualized preview) ---
+    def _on_text_paste(self, event=None):
+        """Sends pastes of LARGE_TEXT_CHARS or more to a loader thread instead of into the widget."""
+        try:
+            text = self.master.clipboard_get()
+        except tk.TclError:
+            return None # Nothing textual to paste; let Tk handle it
+        if len(text) < LARGE_TEXT_CHARS:
+            return "break" if self.large_document is not None else None
+        self._load_large_text(text)
+        return "break"
+
+    def _load_large_text(self, raw_text):
+        self._large_text_generation += 1
+        generation = self._large_text_generation
+        self._large_text_loading = True
+        self.file_label.config(text=f"Loading pasted text ({len(raw_text):,} chars)...", fg="gray")
+        self.clear_file_button.config(state=tk.NORMAL)
+        logging.info(f"Loading a large paste of {len(raw_text)} characters in the background.")
+
+        def load():
+            try:
+                document = TextDocument(raw_text)
+            except Exception as e:
+                self.ui_channel.post(self._large_text_failed, generation, e)
+                return
+            self.ui_channel.post(self._show_large_document, generation, document)
+
+        threading.Thread(target=load, daemon=True).start()
+
+    def _large_text_failed(self, generation, error):
+        if generation != self._large_text_generation:
+            return
+        logging.error(f"Failed to load the pasted text: {error}")
+        self.clear_text_source()
+        messagebox.showerror("Paste Error", f"Could not load the pasted text.\nError: {error}")
+
+    def _show_large_document(self, generation, document):
+        if generation != self._large_text_generation:
+            return # Cleared or replaced while loading
+        self._large_text_loading = False
+        self.autotype_file = None
+        self.large_document = document
+        self.text_entry.config(yscrollcommand=self._set_preview_scrollbar)
+        self.text_entry.vbar.config(command=self._on_preview_scrollbar)
+        self._render_preview(0)
+        self.file_label.config(text=f"Pasted text: {len(document.text) / 1048576:.1f}M chars, "
+                                    f"{document.line_count:,} lines (preview)", fg="blue")
+        logging.info(f"Large paste loaded: {len(document.text)} characters, {document.line_count} lines.")
+
+    def _render_preview(self, first_line):
+        """Puts PREVIEW_LINES lines starting at first_line into the (read-only) text widget."""
+        document = self.large_document
+        self._preview_first_line = first_line
+        self._preview_rendered = max(1, min(PREVIEW_LINES, document.line_count - first_line))
+        self.text_entry.config(state=tk.NORMAL)
+        self.text_entry.delete("1.0", tk.END)
+        self.text_entry.insert("1.0", document.lines(first_line, PREVIEW_LINES))
+        self.text_entry.config(state=tk.DISABLED)
+
+    def _preview_top_line(self):
+        return self._preview_first_line + int(self.text_entry.index("@0,0").split('.')[0]) - 1
+
+    def _preview_scroll_to(self, line):
+        """Shows document line `line` at the top, re-rendering the window when it leaves the rendered lines."""
+        line_count = self.large_document.line_count
+        line = max(0, min(line, line_count - 1))
+        margin = PREVIEW_LINES // 4
+        rendered_end = self._preview_first_line + self._preview_rendered
+        if line < self._preview_first_line or (line + margin > rendered_end and rendered_end < line_count):
+            self._render_preview(max(0, min(line - margin, line_count - PREVIEW_LINES)))
+        self.text_entry.yview(f"{line - self._preview_first_line + 1}.0")
+
+    def _set_preview_scrollbar(self, first, last):
+        """Maps the widget's view of the rendered lines onto the whole document for the scrollbar."""
+        line_count = self.large_document.line_count
+        top = self._preview_first_line + float(first) * self._preview_rendered
+        bottom = self._preview_first_line + float(last) * self._preview_rendered
+        self.text_entry.vbar.set(top / line_count, bottom / line_count)
+
+    def _on_preview_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self._preview_scroll_to(int(float(amount) * self.large_document.line_count))
+        elif action == "scroll":
+            step = int(amount)
+            if unit == "pages":
+                step *= max(1, int(self.text_entry.index(f"@0,{self.text_entry.winfo_height()}").split('.')[0])
+                               - int(self.text_entry.index("@0,0").split('.')[0]))
+            self._preview_scroll_to(self._preview_top_line() + step)
+
+    def _on_preview_wheel(self, event):
+        if self.large_document is None:
+            return None # Normal text box scrolling
+        if event.num == 4 or getattr(event, 'delta', 0) > 0:
+            step = -3
+        else:
+            step = 3
+        self._preview_scroll_to(self._preview_top_line() + step)
+        return "break"
+
+    def open_source_link(self, event=None):
+        import webbrowser # Only needed when the link is clicked
+        webbrowser.open_new("https://github.com/GitHubUser331/RoboKeybo")
 
     def update_wpm_label(self, val):
         self.wpm_label.config(text=f"{val} WPM")
+        if self.typing_active:
+            self.engine.set_wpm(int(val)) # The slider stays live while typing
 
     def setup_window_protocols(self):
         self.master.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -166,16 +3020,29 @@ class AutoTypeApp:
         logging.info("Tray icon thread starting run() loop.")
         self.tray_thread_is_stopped.clear() # Clear the flag, as the thread is starting
         try:
-            icon_instance.run() # This is a blocking call until icon_instance.stop() is called
+            # This is a blocking call until icon_instance.stop() is called at application exit;
+            # between minimizes the icon is only hidden.
+            traced("tray run loop", "tray", icon_instance.run, self._on_tray_icon_ready)
         except Exception as e:
             logging.error(f"Error in tray icon run loop: {e}")
         finally:
             self.tray_thread_is_stopped.set() # Set the flag, indicating the thread has stopped
             logging.info("Tray icon thread finished run() loop.")
 
+    def _on_tray_icon_ready(self, icon_instance):
+        # Only show the icon if the window is still hidden; it may have been restored meanwhile.
+        icon_instance.visible = self.tray_icon_wanted
+        if tracer is not None:
+            tracer.instant("tray ready", "tray", {'visible': self.tray_icon_wanted})
+        logging.info("Tray icon ready.")
+
     def on_closing(self):
         logging.info("Attempting to close application.")
         if messagebox.askokcancel("Quit Application", "Do you really want to quit the program?"):
+            self.engine.stop() # Let a running session end before the window goes away
+            self._close_engines()
+            self._stop_metrics_server()
+            self._close_snippet_store()
             self.stop_hotkey_listener()
             # Ensure tray icon is stopped and its thread terminated if active
             self._stop_tray_icon_and_thread(wait_for_stop=True)
@@ -188,39 +3055,41 @@ class AutoTypeApp:
         if self.master.wm_state() == 'iconic':
             logging.info("Window minimized to system tray.")
             self.master.withdraw() # Hide the window
-            
-            # Ensure any previous tray icon/thread is fully stopped before creating a new one
-            self._stop_tray_icon_and_thread(wait_for_stop=False) # Don't wait aggressively here
-            
-            # Create a new tray icon for this minimize event
-            self.tray_icon = self._create_pystray_icon_object()
+            self.tray_icon_wanted = True
+
+            # The tray icon and its thread are created once and then only shown or hidden.
+            if self.tray_thread and self.tray_thread.is_alive():
+                traced("tray show", "tray", setattr, self.tray_icon, 'visible', True)
+                logging.info("System tray icon shown.")
+                return
+
+            self.tray_icon = traced("tray create", "tray", self._create_pystray_icon_object)
             if self.tray_icon:
-                self.tray_thread = threading.Thread(target=self._run_tray_icon_loop, args=(self.tray_icon,), daemon=True)
+                self.tray_thread = threading.Thread(target=self._run_tray_icon_loop, args=(self.tray_icon,), daemon=True,
+                                                    name="RoboKeyboTray")
                 self.tray_thread.start()
                 logging.info("System tray icon thread launched.")
-                # Give a tiny moment for the thread to start its loop, but don't block Tkinter
-                self.master.after(100, lambda: logging.info("Tray icon launch signal sent."))
             else:
                 logging.error("Failed to create tray icon object on minimize, cannot launch tray.")
 
 
-    def show_window(self, icon, item): # `icon` here is the *old* icon that triggered the click
+    def show_window(self, icon, item):
         logging.info("Restoring window from system tray via menu click.")
-        
-        # Crucial: Stop the *specific* icon that triggered the click.
-        # Set wait_for_stop to False to avoid blocking the main thread,
-        # allowing the window to reappear instantly.
-        if self.tray_icon and icon == self.tray_icon: 
-            self._stop_tray_icon_and_thread(wait_for_stop=False) 
-        else:
-            logging.warning("Show Window called by an unrecognized or already stopped tray icon.")
-            self._stop_tray_icon_and_thread(wait_for_stop=False) # Try to clean up anyway
 
-        # Schedule deiconify, lift, and focus_force immediately on the next Tkinter idle cycle
-        # by setting the delay to 0.
-        self.master.after(0, lambda: self.master.deiconify()) 
-        self.master.after(0, lambda: self.master.lift()) 
-        self.master.after(0, lambda: self.master.focus_force()) 
+        # Hide the icon rather than stopping it, so the next minimize is instant.
+        self.tray_icon_wanted = False
+        try:
+            traced("tray hide", "tray", setattr, icon, 'visible', False)
+        except Exception as e:
+            logging.error(f"Error hiding tray icon: {e}")
+
+        # This runs on the tray thread; hand the restore to the Tk main thread.
+        self.ui_channel.post(self._restore_window)
+
+    def _restore_window(self):
+        self.master.deiconify()
+        self.master.lift()
+        self.master.focus_force()
 
     def exit_app_from_tray(self, icon, item):
         logging.info("Exiting application from system tray.")
@@ -237,12 +3106,16 @@ class AutoTypeApp:
             
         # Immediately schedule the full application exit on the main Tkinter thread.
         # The _perform_full_app_exit will handle waiting for the tray thread to join.
-        self.master.after(0, self._perform_full_app_exit)
+        self.ui_channel.post(self._perform_full_app_exit)
         logging.info("Application exit scheduled on main Tkinter thread.")
 
     def _perform_full_app_exit(self):
         """Performs the full application exit steps on the main Tkinter thread."""
         logging.info("Executing full application exit on main Tkinter thread.")
+        self.engine.stop() # Stop any running typing session
+        self._close_engines()
+        self._stop_metrics_server()
+        self._close_snippet_store()
         self.stop_hotkey_listener() # Stop the hotkey listener
         
         # Now, ensure the tray icon and its thread are fully stopped and joined.
@@ -255,6 +3128,9 @@ class AutoTypeApp:
         logging.info("Application fully exited.")
 
     def _create_pystray_icon_image(self):
+        """Renders the 64x64 tray image once; later calls return the memoized image."""
+        if self._tray_icon_image is not None:
+            return self._tray_icon_image
         width = 64
         height = 64
         image = Image.new('RGBA', (width, height), (0, 0, 0, 0))
@@ -274,11 +3150,13 @@ class AutoTypeApp:
         y = (height - text_height) / 2
 
         draw.text((x, y), text, font=font, fill=(255, 255, 255, 255))
+        self._tray_icon_image = image
         return image
 
     def _create_pystray_icon_object(self):
-        """Creates a fresh pystray.Icon object."""
+        """Creates the long-lived pystray.Icon object."""
         try:
+            load_tray_modules() # Deferred until the first minimize
             menu = pystray.Menu(
                 pystray.MenuItem('Show Window', self.show_window),
                 pystray.MenuItem('Exit', self.exit_app_from_tray)
@@ -304,11 +3182,11 @@ class AutoTypeApp:
                 if wait_for_stop and self.tray_thread and self.tray_thread.is_alive():
                     # Only wait if requested and the thread is still alive
                     logging.info("Waiting for tray thread to confirm stop and join...")
-                    self.tray_thread_is_stopped.wait(timeout=5) # Max wait for thread to set its 'stopped' flag
+                    self.tray_thread_is_stopped.wait(timeout=TRAY_STOP_TIMEOUT_S) # Max wait for thread to set its 'stopped' flag
                     if not self.tray_thread_is_stopped.is_set():
                         logging.warning("Tray thread did not confirm stop within timeout.")
                     
-                    self.tray_thread.join(timeout=1) # Give it a final moment to join
+                    self.tray_thread.join(timeout=0.1) # Give it a final moment to join (it is a daemon thread)
                     if self.tray_thread.is_alive():
                         logging.error("Tray thread did not terminate after join.")
                     else:
@@ -329,41 +3207,95 @@ class AutoTypeApp:
 
     def setup_system_tray(self):
         """Initial setup of the tray icon (not run blocking, just creates object)."""
-        pass # The tray icon object is created *on minimize* now.
+        pass # The tray icon object is created on the first minimize and kept until exit.
 
     def hotkey_callback(self):
+        # Runs on the pynput listener thread: Tk work is posted to the UI channel.
+        if self._snippet_session is not None:
+            self.engine.stop() # The main hotkey stops a snippet whether or not autotype is enabled
+            return
         if not self.autotype_enabled:
             logging.info(f"Hotkey '{self.current_hotkey}' pressed, but autotype is disabled by the button.")
-            self.master.after(100, lambda: self.status_label.config(text="Autotype is currently DISABLED. Click 'Activate Autotype' first.", fg="red"))
+            self.ui_channel.post(self._set_status, "Autotype is currently DISABLED. Click 'Activate Autotype' first.", "red")
             return
 
         if not self.typing_active:
-            self.typing_active = True
-            self.typing_stop_event.clear() 
-            self._disable_input_controls() # Disable controls when typing starts
-            threading.Thread(target=self.perform_autotype, daemon=True).start()
-            self.master.after(100, lambda: self.status_label.config(text=f"Autotyping... Press {self.current_hotkey} again to STOP.", fg="green"))
-            logging.info("Autotype started by hotkey.")
+            self.ui_channel.post(self._start_autotype_from_hotkey)
         else:
-            # When hotkey is pressed again to stop, simply set the event.
-            # The perform_autotype thread will detect this and handle cleanup.
-            self.typing_stop_event.set()
-            self.master.after(100, lambda: self.status_label.config(text="Autotype stopped by hotkey. Ready.", fg="gray"))
-            logging.info("Autotype stopped by hotkey.")
+            # When hotkey is pressed again to pause, signal the engine right away.
+            # The typing thread will detect this and handle cleanup; the offset is kept for resuming.
+            self.engine.stop()
+            self.ui_channel.post(self._set_status, "Autotype paused by hotkey.", "gray")
+            logging.info("Autotype paused by hotkey.")
             # Do NOT call _finish_autotype_process here, as it will be called by the typing thread itself.
 
+    def _start_autotype_from_hotkey(self):
+        if self.typing_active or not self.autotype_enabled:
+            return # A second press or a deactivation arrived in the same frame
+        self.typing_active = True
+        self._disable_input_controls() # Disable controls when typing starts
+        try:
+            self.perform_autotype()
+        except Exception as e:
+            logging.error(f"Could not start autotype: {e}")
+            if self._active_source is not None:
+                self._active_source.close()
+                self._active_source = None
+            self._finish_autotype_process(f"Could not start autotype: {e}")
+        if not self.typing_active:
+            return # The source could not be opened
+        self._set_status(f"Autotyping... Press {self.current_hotkey} again to PAUSE.", "green")
+        logging.info("Autotype started by hotkey.")
+
+    def _set_status(self, text, color):
+        self.status_label.config(text=text, fg=color)
+
+    def _poll_ui_channel(self):
+        """Drains the UI channel once per frame on the Tk main thread."""
+        calls, progress = self.ui_channel.drain()
+        for func, args in calls:
+            try:
+                traced(getattr(func, '__name__', "ui update"), "ui", func, *args)
+            except Exception as e:
+                logging.error(f"Error in UI update {getattr(func, '__name__', func)}: {e}")
+        if progress is not None:
+            traced("_show_progress", "ui", self._show_progress, *progress)
+        try:
+            self.master.after(UI_FRAME_INTERVAL_MS, self._poll_ui_channel)
+        except tk.TclError:
+            pass # The window is being destroyed
+
+    def _show_progress(self, position, total, elapsed):
+        if not self.typing_active:
+            return # A late update after the session finished
+        chars_done = position - self._session_start_offset
+        achieved_wpm = chars_done / elapsed * 60 / CHARS_PER_WORD if elapsed > 0 else 0.0
+        text = f"{position:,} chars"
+        if total:
+            text += f" / {total:,} ({position / total:.0%})"
+        elif isinstance(self._active_source, CsvFormSource):
+            rows_done, rows = self._active_source.rows_done(position), self._active_source.row_count
+            text = f"Record {min(rows_done + 1, rows):,} of {rows:,} ({rows_done / rows if rows else 1:.0%})"
+            if rows_done and chars_done > 0:
+                total = position * rows / rows_done # Estimated from the characters per record so far
+        elif self._active_source is not None and self._active_source.size:
+            # Streamed files have no character total; the byte offset gives the fraction done.
+            done_bytes, size = self._active_source.byte_position(position), self._active_source.size
+            text += f"  |  {done_bytes / 1048576:.1f} of {size / 1048576:.1f} MB ({done_bytes / size:.0%})"
+            if done_bytes and chars_done > 0:
+                total = position * size / done_bytes # Estimated from the bytes per character so far
+        text += f"  |  {achieved_wpm:.0f} WPM"
+        if total and chars_done > 0 and elapsed > 0:
+            eta = int(max(0, total - position) * elapsed / chars_done)
+            text += f"  |  ETA {eta // 60}:{eta % 60:02d}"
+        self.progress_label.config(text=text)
 
-    def start_hotkey_listener(self):
-        if self.pynput_listener:
-            self.pynput_listener.stop()
-            self.pynput_listener.join(timeout=1)
-            logging.info("Previous hotkey listener stopped.")
 
+    def start_hotkey_listener(self):
+        """Starts the long-lived hotkey listener (once) and installs the current bindings."""
         try:
-            self.pynput_listener = keyboard.GlobalHotKeys({
-                self.current_hotkey: self.hotkey_callback
-            })
-            self.pynput_listener.start()
+            self.hotkey_dispatcher.start()
+            self.apply_hotkey_bindings()
             self.master.after(0, lambda: self.status_label.config(text=f"Ready. Hotkey: {self.current_hotkey}", fg="gray"))
             logging.info(f"Hotkey listener started for: {self.current_hotkey}")
         except Exception as e:
@@ -371,10 +3303,25 @@ class AutoTypeApp:
             self.master.after(0, lambda: self.status_label.config(text=f"Error starting hotkey listener: {e}", fg="red"))
             messagebox.showerror("Hotkey Error", f"Could not start hotkey listener. This might prevent autotyping.\nError: {e}")
 
+    def hotkey_bindings(self):
+        """The hotkey -> action table the listener dispatches through."""
+        bindings = {}
+        if self.snippets is not None:
+            for snippet in self.snippets.index.values():
+                # The main hotkey wins over a snippet that was given the same key
+                if snippet.hotkey and snippet.hotkey != self.current_hotkey and self.is_valid_single_hotkey(snippet.hotkey):
+                    bindings[snippet.hotkey] = functools.partial(self._snippet_hotkey, snippet.name)
+        bindings[self.current_hotkey] = self.hotkey_callback
+        return bindings
+
+    def apply_hotkey_bindings(self):
+        """Swaps the current bindings into the running listener without restarting it."""
+        self.hotkey_dispatcher.set_bindings(self.hotkey_bindings(), required=(self.current_hotkey,))
+        logging.info(f"Hotkey bindings updated: {', '.join(self.hotkey_bindings())}")
+
     def stop_hotkey_listener(self):
-        if self.pynput_listener and self.pynput_listener.running:
-            self.pynput_listener.stop()
-            self.pynput_listener.join(timeout=1)
+        if self.hotkey_dispatcher.running:
+            self.hotkey_dispatcher.stop()
             logging.info("Hotkey listener stopped.")
 
     def is_valid_single_hotkey(self, hotkey_str):
@@ -404,19 +3351,27 @@ class AutoTypeApp:
         new_hotkey_candidate = self.hotkey_input_var.get().strip()
 
         if self.is_valid_single_hotkey(new_hotkey_candidate):
+            previous_hotkey = self.current_hotkey
             self.current_hotkey = new_hotkey_candidate.lower()
+            try:
+                self.apply_hotkey_bindings()
+            except Exception as e:
+                # The old table is still installed; keep the UI consistent with it.
+                logging.error(f"Failed to update hotkey bindings: {e}")
+                self.current_hotkey = previous_hotkey
+                self.hotkey_input_var.set(self.current_hotkey)
+                self.status_label.config(text=f"Key not supported on this system: {new_hotkey_candidate}", fg="red")
+                return
             self.hotkey_display_label.config(text=self.current_hotkey, fg="blue")
             self.status_label.config(text=f"Hotkey assigned to: {self.current_hotkey}", fg="darkgreen")
             logging.info(f"Hotkey set to: {self.current_hotkey}")
-            self.start_hotkey_listener()
         else:
             messagebox.showwarning("Invalid Hotkey",
                                    "Please enter a single, valid key (e.g., 'f8', 'a', 'space', 'enter'). "
                                    "Combinations (like ctrl+a) or modifier keys alone are not supported.")
             self.status_label.config(text="Invalid hotkey. Reverting to previous.", fg="orange")
             logging.warning(f"Attempted to set invalid hotkey: '{new_hotkey_candidate}'")
-            self.hotkey_input_var.set(self.current_hotkey)
-            self.start_hotkey_listener()
+            self.hotkey_input_var.set(self.current_hotkey) # The listener keeps its current bindings
 
 
     def toggle_autotype_enabled(self):
@@ -424,7 +3379,39 @@ class AutoTypeApp:
         self.update_autotype_button_state()
 
         if self.autotype_enabled:
-            self.autotype_text = self.text_entry.get("1.0", tk.END).strip()
+            transforms = EDITOR_TARGETS[self.editor_target_var.get()]
+            if self.autotype_csv_header is not None:
+                self._arm_csv_file()
+                return
+            if self.autotype_file is not None and not transforms:
+                self._arm_text_file()
+                return
+            if self._large_text_loading:
+                messagebox.showinfo("Still Loading", "The pasted text is still loading. Try again in a moment.")
+                self.autotype_enabled = False
+                self.update_autotype_button_state()
+                return
+            self.autotype_plan = None
+            self.autotype_stream = None
+            self.autotype_form = None
+            if self.autotype_file is not None:
+                # The transforms need the whole text, so the file is read instead of streamed
+                try:
+                    with MappedTextSource(self.autotype_file) as source:
+                        self.autotype_text = source.read().strip()
+                except (OSError, LookupError) as e:
+                    messagebox.showerror("File Error", f"Could not read the file.\nError: {e}")
+                    self.autotype_text = ""
+            elif self.large_document is not None:
+                # Already normalized and compiled by the loader thread
+                self.autotype_text = self.large_document.text
+                self.autotype_plan = self.large_document.plan
+            else:
+                self.autotype_text = self.text_entry.get("1.0", tk.END).strip()
+            keystrokes_saved = 0
+            if transforms and self.autotype_text:
+                self.autotype_text, keystrokes_saved = preprocess_text(self.autotype_text, transforms)
+                self.autotype_plan = None
             if not self.autotype_text:
                 messagebox.showwarning("No Text", "Please enter some text in the box to autotype.")
                 logging.warning("Autotype activation failed: No text entered.")
@@ -433,25 +3420,109 @@ class AutoTypeApp:
                 # Re-enable controls if activation fails
                 self._re_enable_input_controls() 
                 return
+            if self.autotype_plan is None:
+                self.autotype_plan = get_keystroke_plan(self.autotype_text)
+            self.autotype_hash = self.autotype_plan.text_hash
+            self.resume_offset = self._offer_resume()
 
-            self.status_label.config(text=f"Autotype ENABLED. Press {self.current_hotkey} to START/STOP.", fg="blue")
+            status = f"Autotype ENABLED. Press {self.current_hotkey} to START/PAUSE."
+            if keystrokes_saved:
+                status += f" {keystrokes_saved:,} keystrokes saved."
+            self.status_label.config(text=status, fg="blue")
             logging.info("Autotype enabled. Awaiting hotkey press to start/stop.")
             # Input controls remain enabled until typing starts
         else:
             # If autotype is being disabled and typing is active, signal the typing thread to stop.
             if self.typing_active:
-                self.typing_stop_event.set() # Signal the typing thread to stop
+                self.engine.stop() # Signal the typing thread to stop
             # Do NOT reset typing_active, clear event, or re-enable controls here.
             # The _finish_autotype_process will handle these after the typing thread stops.
+            self.resume_offset = 0 # Re-enabling offers the on-disk checkpoint instead
             self.status_label.config(text="Autotype DISABLED. Click button to ENABLE.", fg="red")
             logging.info("Autotype disabled by button click.")
             # _re_enable_input_controls() will be called by _finish_autotype_process if typing was active.
             # If typing wasn't active, ensure controls are re-enabled directly.
             if not self.typing_active: # If typing was not active, controls might be disabled if a hotkey started it and then the button was pressed.
                 self._re_enable_input_controls() # Ensure controls are re-enabled even if typing wasn't active.
-                self.typing_stop_event.clear() # Clear the event for a clean state if no typing occurred.
 
 
+    def _arm_text_file(self):
+        """Arms the chosen file; it is hashed here and streamed in blocks once typing starts."""
+        try:
+            text_hash = hash_file(self.autotype_file)
+        except OSError as e:
+            messagebox.showerror("File Error", f"Could not read the file.\nError: {e}")
+            logging.warning(f"Autotype activation failed: cannot read {self.autotype_file}: {e}")
+            self.autotype_enabled = False
+            self.update_autotype_button_state()
+            return
+        self.autotype_text = ""
+        self.autotype_plan = None
+        self.autotype_stream = self.autotype_file
+        self.autotype_form = None
+        self.autotype_hash = text_hash
+        self.resume_offset = self._offer_resume()
+        self.status_label.config(text=f"Autotype ENABLED. Press {self.current_hotkey} to START/PAUSE.", fg="blue")
+        logging.info(f"Autotype enabled for file {self.autotype_file}. Awaiting hotkey press to start/stop.")
+
+    def _form_fill_keys(self):
+        return FORM_FILL_KEYS[self.field_key_var.get()], FORM_FILL_KEYS[self.record_key_var.get()]
+
+    def _get_record_delay(self):
+        """Reads the record delay spinbox, clamped to the supported range."""
+        try:
+            delay = float(self.record_delay_spinbox.get())
+        except ValueError:
+            logging.warning(f"Invalid record delay '{self.record_delay_spinbox.get()}', using {DEFAULT_RECORD_DELAY_S}.")
+            return DEFAULT_RECORD_DELAY_S
+        return max(0.0, min(MAX_RECORD_DELAY_S, delay))
+
+    def _arm_csv_file(self):
+        """Arms the chosen CSV form fill with the current field and record keys."""
+        # Captured now: the checkpoint key depends on the form options, and the controls stay live while armed
+        field_key, record_key = self._form_fill_keys()
+        try:
+            text_hash = hash_csv_form(self.autotype_file, field_key, record_key, self.autotype_csv_header)
+        except OSError as e:
+            messagebox.showerror("File Error", f"Could not read the file.\nError: {e}")
+            logging.warning(f"Autotype activation failed: cannot read {self.autotype_file}: {e}")
+            self.autotype_enabled = False
+            self.update_autotype_button_state()
+            return
+        self.autotype_text = ""
+        self.autotype_plan = None
+        self.autotype_stream = self.autotype_file
+        self.autotype_hash = text_hash
+        self.autotype_form = (field_key, record_key, self._get_record_delay(), self.autotype_csv_header)
+        self.resume_offset = self._offer_resume()
+        self.status_label.config(text=f"Form fill ENABLED. Press {self.current_hotkey} to START/PAUSE.", fg="blue")
+        logging.info(f"Autotype enabled for form fill from {self.autotype_file}. Awaiting hotkey press to start/stop.")
+
+    def _checkpoint_path(self):
+        try:
+            return SessionCheckpoint.default_path()
+        except OSError as e:
+            logging.error(f"Checkpoints disabled, cannot create state directory: {e}")
+            return None
+
+    def _offer_resume(self):
+        """Returns the offset to start from, asking to resume if a checkpoint exists for the armed text."""
+        path = self._checkpoint_path()
+        if path is None:
+            return 0
+        total = len(self.autotype_text) if self.autotype_text else None # None while a file is streamed
+        saved_offset = SessionCheckpoint.load_offset(path, self.autotype_hash)
+        if saved_offset <= 0 or (total is not None and saved_offset >= total):
+            return 0
+        where = f"{saved_offset:,} of {total:,} ({saved_offset / total:.0%})" if total else f"{saved_offset:,}"
+        if messagebox.askyesno("Resume Session",
+                               f"This text was interrupted at character {where}.\nResume from there?"):
+            logging.info(f"Resuming checkpointed session at offset {saved_offset}.")
+            return saved_offset
+        SessionCheckpoint(path, self.autotype_hash).clear()
+        logging.info("Checkpointed session discarded; starting from the beginning.")
+        return 0
+
     def update_autotype_button_state(self):
         if self.autotype_enabled:
             self.autotype_button.config(text="Deactivate Autotype", bg="#F44336", activebackground="#d32f2f")
@@ -459,101 +3530,725 @@ class AutoTypeApp:
             self.autotype_button.config(text="Activate Autotype", bg="#2196F3", activebackground="#1e88e5")
 
     def _disable_input_controls(self):
-        """Disables input fields (hotkey entry, WPM slider)."""
+        """Disables input fields (hotkey entry, session options); the WPM slider stays live."""
         self.hotkey_input_entry.config(state=tk.DISABLED)
-        self.wpm_slider.config(state=tk.DISABLED)
+        self.burst_mode_check.config(state=tk.DISABLED)
+        self.burst_size_spinbox.config(state=tk.DISABLED)
+        self.clipboard_mode_check.config(state=tk.DISABLED)
+        self.editor_target_menu.config(state=tk.DISABLED)
+        self.process_mode_check.config(state=tk.DISABLED)
+        self.load_file_button.config(state=tk.DISABLED)
+        self.clear_file_button.config(state=tk.DISABLED)
+        self.load_csv_button.config(state=tk.DISABLED)
+        self.use_snippet_button.config(state=tk.DISABLED)
+        self.save_snippet_button.config(state=tk.DISABLED)
+        self.delete_snippet_button.config(state=tk.DISABLED)
+        self.field_key_menu.config(state=tk.DISABLED)
+        self.record_key_menu.config(state=tk.DISABLED)
+        self.record_delay_spinbox.config(state=tk.DISABLED)
 
     def _re_enable_input_controls(self):
         """Re-enables input fields (hotkey entry, WPM slider)."""
         self.hotkey_input_entry.config(state=tk.NORMAL)
         self.wpm_slider.config(state=tk.NORMAL)
+        self.burst_mode_check.config(state=tk.NORMAL)
+        self.burst_size_spinbox.config(state=tk.NORMAL)
+        self.clipboard_mode_check.config(state=tk.NORMAL)
+        self.editor_target_menu.config(state=tk.NORMAL)
+        self.process_mode_check.config(state=tk.NORMAL)
+        self.load_file_button.config(state=tk.NORMAL)
+        self.load_csv_button.config(state=tk.NORMAL)
+        snippet_state = tk.NORMAL if self.snippets is not None else tk.DISABLED
+        self.use_snippet_button.config(state=snippet_state)
+        self.save_snippet_button.config(state=snippet_state)
+        self.delete_snippet_button.config(state=snippet_state)
+        self.field_key_menu.config(state=tk.NORMAL)
+        self.record_key_menu.config(state=tk.NORMAL)
+        self.record_delay_spinbox.config(state=tk.NORMAL)
+        has_source = self.autotype_file is not None or self.large_document is not None or self._large_text_loading
+        self.clear_file_button.config(state=tk.NORMAL if has_source else tk.DISABLED)
 
 
     def perform_autotype(self):
-        text_to_type = self.autotype_text
-
+        """Hands the armed text and the current speed settings to the typing engine (Tk main thread)."""
         wpm = self.wpm_slider.get()
-        characters_per_second = wpm * 5 / 60
-        delay_per_char = 1.0 / characters_per_second if characters_per_second > 0 else 0.01
+        # Burst mode injects run-length chunks with one call, one stop check and one pacing wait each.
+        chunk_size = self._get_burst_size() if self.burst_mode_var.get() else 1
+        self._listener_stats_at_start = self.synthetic_filter.snapshot()
+        self._session_start_offset = self.resume_offset
+        source = self.autotype_text
+        if self.autotype_stream is not None: # Armed to stream the file
+            try:
+                if self.autotype_form is not None:
+                    source = CsvFormSource(self.autotype_stream, *self.autotype_form)
+                    source.count_rows()
+                else:
+                    source = MappedTextSource(self.autotype_stream)
+            except (OSError, LookupError, csv.Error) as e:
+                self._finish_autotype_process(f"Could not open file: {e}")
+                return
+            self._active_source = source
+        path = self._checkpoint_path()
+        total = None if self._active_source is not None else len(self.autotype_text)
+        if not path:
+            checkpoint = None
+        elif isinstance(source, CsvFormSource):
+            checkpoint = RowCheckpoint(path, self.autotype_hash, source)
+        else:
+            checkpoint = SessionCheckpoint(path, self.autotype_hash, total)
+        self.engine = self._choose_engine(source)
+        self.engine.start(source, wpm, burst_size=chunk_size,
+                          use_clipboard=self.clipboard_mode_var.get(),
+                          unthrottled=chunk_size > 1 and wpm >= MAX_WPM,
+                          countdown=RESUME_COUNTDOWN_SECONDS if self.resume_offset else self.countdown_seconds,
+                          start_offset=self.resume_offset, checkpoint=checkpoint,
+                          plan=self.autotype_plan if source is self.autotype_text else None)
 
-        logging.info(f"Starting autotype for {len(text_to_type)} characters at {wpm} WPM (delay: {delay_per_char:.3f}s/char).")
+    def _choose_engine(self, source):
+        """The typing process when it is enabled and can type this session, else the in-process engine."""
+        if not self.process_mode_var.get():
+            return self.thread_engine
+        if not isinstance(source, str) or self.clipboard_mode_var.get():
+            logging.info("Streamed files and clipboard-assisted sessions are typed in-process.")
+            return self.thread_engine
+        if self.process_engine is None:
+            self.process_engine = TypingProcess(on_status=self._on_engine_status, on_progress=self._on_engine_progress,
+                                                on_finish=self._on_engine_finish, on_error=self._on_engine_error,
+                                                synthetic_filter=self.synthetic_filter, backend=self.backend)
+        return self.process_engine
 
-        # Check for stop event before starting countdown
-        if self.typing_stop_event.is_set():
-            logging.info("Autotype cancelled before countdown due to stop event.")
-            self._finish_autotype_process()
+    def _close_engines(self):
+        self.thread_engine.close()
+        if self.process_engine is not None:
+            self.process_engine.close()
+
+    def _start_metrics_server(self):
+        try:
+            self.metrics_server = MetricsServer(self._metrics_snapshot, self.metrics_port)
+            self.metrics_server.start()
+        except OSError as e:
+            logging.error(f"Could not start the metrics endpoint on port {self.metrics_port}: {e}")
+            self.metrics_server = None
+
+    def _stop_metrics_server(self):
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+            self.metrics_server = None
+
+    def _metrics_snapshot(self):
+        """Live metrics for the endpoint; runs on a server thread, so it reads engine state only."""
+        engine = self.engine
+        return {'running': engine.running,
+                'session': engine.live_metrics() if engine.running else None,
+                'last_session': self._last_session}
+
+    # Engine callbacks run on the typing (or typing process reader) thread and only post to the UI channel.
+    def _on_engine_status(self, text, color):
+        self.ui_channel.post(self._set_status, text, color)
+
+    def _on_engine_progress(self, position, total, elapsed):
+        self.ui_channel.post_progress(position, total, elapsed)
+
+    def _on_engine_error(self, error):
+        self.ui_channel.post(self._set_status, "Typing interrupted due to error.", "red")
+        self.ui_channel.post(messagebox.showerror, "Typing Error", f"An error occurred during autotyping: {error}")
+
+    def _on_engine_finish(self, summary):
+        self.ui_channel.post(self._show_summary, summary)
+
+    def _show_summary(self, summary):
+        if self._listener_stats_at_start is not None:
+            events, dropped, cpu = (end - start for end, start in
+                                    zip(self.synthetic_filter.snapshot(), self._listener_stats_at_start))
+            logging.info(f"Hotkey listener during session: {events} events, {dropped} synthetic events dropped, "
+                         f"{cpu * 1000:.1f}ms listener CPU.")
+        rows = None
+        if self._active_source is not None:
+            if isinstance(self._active_source, CsvFormSource):
+                rows = (self._active_source.rows_done(summary['position']), self._active_source.row_count)
+            self._active_source.close()
+            self._active_source = None
+        self._last_session = summary
+        write_session_record(summary)
+        self.progress_label.config(text=f"{summary['chars_typed']:,} chars typed in {summary['elapsed']:.1f}s")
+        if self._snippet_session is not None:
+            # Snippet sessions leave the armed text and its resume offset alone
+            name, self._snippet_session = self._snippet_session, None
+            if summary['error']:
+                self._finish_autotype_process(f"Snippet '{name}' interrupted due to error.")
+            elif summary['stopped']:
+                self._finish_autotype_process(f"Snippet '{name}' stopped at character {summary['position']:,}.")
+            else:
+                self._finish_autotype_process(f"Snippet '{name}' typed. Ready.")
             return
+        position, total = summary['position'], summary['total_chars']
+        # Keep the offset for the next hotkey press unless the text was finished or disarmed.
+        unfinished = summary['stopped'] or summary['error'] if total is None else position < total
+        self.resume_offset = position if self.autotype_enabled and unfinished else 0
+        if summary['error']:
+            self._finish_autotype_process("Typing interrupted due to error.")
+        elif self.resume_offset:
+            if rows is not None:
+                where = f"record {rows[0] + 1:,} of {rows[1]:,}"
+            else:
+                where = f"{position:,} of {total:,} ({position / total:.0%})" if total else f"character {position:,}"
+            self._finish_autotype_process(f"Paused at {where}. Press {self.current_hotkey} to RESUME.")
+        else:
+            self._finish_autotype_process(f"Autotyping complete. Achieved {summary['achieved_wpm']:.0f} WPM "
+                                          f"(target {summary['target_wpm']}). Ready.")
 
-        # Countdown loop
-        for i in range(3, 0, -1):
-            self.master.after(100, lambda i=i: self.status_label.config(text=f"Typing in {i}...", fg="orange"))
-            # Use wait instead of sleep, allowing immediate interruption
-            if self.typing_stop_event.wait(1): # Wait for 1 second, or return True if event is set
-                logging.info(f"Autotype interrupted during countdown (via wait) at {i} seconds.")
-                self._finish_autotype_process()
-                return # Exit the function if stop event is set
-        
-        # Check for stop event after countdown
-        if self.typing_stop_event.is_set():
-            logging.info("Autotype cancelled after countdown due to stop event.")
-            self._finish_autotype_process()
-            return # Exit the function if stop event is set
-
-        self.master.after(100, lambda: self.status_label.config(text="Typing...", fg="green"))
-
-        # Main typing loop
-        for char in text_to_type:
-            # Check for stop event during each character type
-            if self.typing_stop_event.is_set():
-                logging.info("Autotype interrupted by stop event during typing.")
-                break
-            # Check if Tkinter window exists (for robustness against window closure)
-            if not self.master.winfo_exists():
-                logging.warning("Autotype interrupted: Tkinter window destroyed during typing.")
-                break
-            try:
-                self.keyboard_controller.type(char)
-                time.sleep(delay_per_char)
-            except Exception as e:
-                logging.error(f"Error during typing: {e}")
-                self.master.after(0, lambda: self.status_label.config(text="Typing interrupted due to error.", fg="red"))
-                messagebox.showerror("Typing Error", f"An error occurred during autotyping: {e}")
-                break
-        
-        # Call a common method to finalize the autotype process
-        self._finish_autotype_process()
+    def _get_burst_size(self):
+        """Reads the burst size spinbox, clamped to the supported range."""
+        try:
+            size = int(self.burst_size_spinbox.get())
+        except ValueError:
+            logging.warning(f"Invalid burst size '{self.burst_size_spinbox.get()}', using {DEFAULT_BURST_SIZE}.")
+            return DEFAULT_BURST_SIZE
+        return max(MIN_BURST_SIZE, min(MAX_BURST_SIZE, size))
 
-    def _finish_autotype_process(self):
+    def _finish_autotype_process(self, status_text="Autotyping complete. Ready."):
         """Resets typing state and updates UI after autotyping completes or stops."""
         self.typing_active = False
-        self.typing_stop_event.clear() # Always clear the event after a session
-        self.master.after(0, lambda: self.status_label.config(text="Autotyping complete. Ready.", fg="gray"))
-        logging.info("Autotyping finished (or stopped forcefully).\n") # Added newline for clarity
+        self._set_status(status_text, "gray")
         # Ensure controls are re-enabled
         self._re_enable_input_controls()
 
 
-# --- Main Application Execution ---
-if __name__ == "__main__":
-    root = None
+# --- Benchmarks ---
+# Headless measurements of the hot paths, typed into a RecordingBackend (never into a real
+# window). Benchmarks that need a desktop (hotkey, listener, tray, GUI start) report why they were
+# skipped instead of failing.
+BENCHMARK_SAMPLE_TEXT = ("The quick brown fox jumps over the lazy dog 0123456789.\n"
+                         "\tif (value) { items[index] = compute(value, \"ok\"); }\n")
+
+
+def _benchmark_text(chars):
+    return (BENCHMARK_SAMPLE_TEXT * (chars // len(BENCHMARK_SAMPLE_TEXT) + 1))[:chars]
+
+
+def _summarize_ms(samples):
+    """Percentiles (in milliseconds) of durations given in seconds."""
+    if not samples:
+        return None
+    samples = sorted(samples)
+    def percentile(p):
+        return round(samples[min(len(samples) - 1, int(len(samples) * p / 100))] * 1000, 3)
+    return {'count': len(samples), 'p50_ms': percentile(50), 'p90_ms': percentile(90),
+            'p99_ms': percentile(99), 'max_ms': round(samples[-1] * 1000, 3)}
+
+
+def benchmark_throughput():
+    """Highest sustained characters per second of the unthrottled typing loop, per burst size."""
+    text = _benchmark_text(BENCHMARK_THROUGHPUT_CHARS)
+    compile_start = time.perf_counter()
+    get_keystroke_plan(text)
+    results = {'chars': len(text), 'plan_compile_ms': round((time.perf_counter() - compile_start) * 1000, 3)}
+    for burst_size in (1, DEFAULT_BURST_SIZE):
+        engine = TypingEngine(backend=RecordingBackend())
+        summary = engine.run(text, MAX_WPM, burst_size=burst_size, unthrottled=True, countdown=0)
+        results[f'burst_{burst_size}_chars_per_s'] = round(summary['chars_typed'] / summary['elapsed'])
+    return results
+
+
+def benchmark_pacing(seconds):
+    """Deviation of each inter-keystroke interval from the target interval, per target WPM."""
+    results = {}
+    for wpm in BENCHMARK_WPM_TARGETS:
+        chars_per_second = wpm * CHARS_PER_WORD / 60
+        backend = RecordingBackend()
+        engine = TypingEngine(backend=backend)
+        engine.start(_benchmark_text(max(20, int(chars_per_second * seconds))), wpm, countdown=0)
+        engine.join()
+        target_interval = 1 / chars_per_second
+        result = _summarize_ms([abs(interval - target_interval) for interval in backend.press_intervals()])
+        result['achieved_wpm'] = round(engine.pacer.achieved_wpm(), 1)
+        results[str(wpm)] = result
+    return results
+
+
+def benchmark_hotkey_latency(repeats):
+    """Time from the listener delivering a hotkey press to the first injected key.
+
+    The press takes the path of a physical one, with the countdown set to 0: the
+    dispatcher's canonicalization, synthetic filter and table lookup on a thread of its
+    own, the UI channel hop to the Tk main thread, and perform_autotype.
+    """
     try:
+        load_gui_modules()
         root = tk.Tk()
-        root.withdraw() # Hide initial window to prevent flicker
+    except Exception as e:
+        return {'skipped': f"No GUI available: {e}"}
+    app = AutoTypeApp(root, backend='recording')
+    samples = []
+    try:
+        if not app.hotkey_dispatcher.running:
+            return {'skipped': "No keyboard listener available."}
+        backend = app.thread_engine.backend = RecordingBackend()
+        app.countdown_seconds = 0
+        app.text_entry.insert("1.0", "x")
+        app.toggle_autotype_enabled()
+        hotkey = parse_hotkey(app.current_hotkey)
+
+        def press(pressed):
+            pressed.append(time.perf_counter())
+            app.hotkey_dispatcher._dispatch(hotkey)
+
+        for _ in range(repeats):
+            backend.events.clear()
+            pressed = []
+            threading.Thread(target=press, args=(pressed,)).start() # Stands in for the listener thread
+            _pump_until(root, lambda: backend.events and not app.typing_active)
+            samples.append(backend.events[0][0] - pressed[0])
+    except Exception as e:
+        return {'skipped': f"Hotkey benchmark failed: {e}"}
+    finally:
+        app._perform_full_app_exit()
+    return _summarize_ms(samples)
+
+
+def benchmark_listener_restart(repeats):
+    """Time to start the hotkey listener until it receives events, and to stop it again."""
+    try:
+        dispatcher = HotkeyDispatcher(SyntheticEventFilter())
+        starts, stops = [], []
+        for _ in range(repeats):
+            begin = time.perf_counter()
+            dispatcher.start()
+            dispatcher.listener.wait()
+            starts.append(time.perf_counter() - begin)
+            begin = time.perf_counter()
+            dispatcher.stop()
+            stops.append(time.perf_counter() - begin)
+    except Exception as e:
+        return {'skipped': f"No keyboard listener available: {e}"}
+    return {'start': _summarize_ms(starts), 'stop': _summarize_ms(stops)}
+
+
+def _pump_until(root, condition, timeout=5.0):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("Timed out waiting for the window or tray icon.")
+        root.update()
+        time.sleep(0.001)
+
+
+def benchmark_tray_cycle(repeats):
+    """Minimize-to-tray and restore times of the GUI (the first minimize creates the tray icon)."""
+    try:
+        load_gui_modules()
+        load_tray_modules()
+        root = tk.Tk()
+    except Exception as e:
+        return {'skipped': f"No GUI available: {e}"}
+    app = AutoTypeApp(root, backend='recording')
+    minimizes, restores = [], []
+    try:
+        _pump_until(root, lambda: root.state() == 'normal')
+        for _ in range(repeats):
+            begin = time.perf_counter()
+            root.iconify() # <Unmap> runs on_minimize
+            _pump_until(root, lambda: app.tray_icon is not None and app.tray_icon.visible)
+            minimizes.append(time.perf_counter() - begin)
+            begin = time.perf_counter()
+            app.show_window(app.tray_icon, None)
+            _pump_until(root, lambda: root.state() == 'normal')
+            restores.append(time.perf_counter() - begin)
+    except Exception as e:
+        return {'skipped': f"Tray cycle failed: {e}"}
+    finally:
+        app._perform_full_app_exit()
+    return {'first_minimize_ms': round(minimizes[0] * 1000, 3), 'minimize': _summarize_ms(minimizes[1:]),
+            'restore': _summarize_ms(restores)}
+
+
+def benchmark_cold_start(repeats):
+    """Wall time of fresh processes: a one-character headless run and (with a desktop) the GUI start."""
+    import subprocess # Only needed here
+    command = [sys.executable] if getattr(sys, 'frozen', False) else [sys.executable, os.path.abspath(__file__)]
+    runs = {'headless': ["--no-gui", "--text", "x", "--countdown", "0", "--backend", "recording"],
+            'gui': ["--startup-report", "--backend", "recording"]}
+    results = {}
+    for name, arguments in runs.items():
+        samples = []
+        for _ in range(repeats):
+            begin = time.perf_counter()
+            completed = subprocess.run(command + arguments, capture_output=True, text=True)
+            if completed.returncode != 0:
+                break
+            samples.append(time.perf_counter() - begin)
+        if samples:
+            results[name] = _summarize_ms(samples)
+        else:
+            results[name] = {'skipped': f"Exit code {completed.returncode}: {completed.stderr.strip()[-200:]}"}
+    return results
+
+
+def _flatten_numbers(results, prefix=''):
+    for key, value in results.items():
+        if isinstance(value, dict):
+            yield from _flatten_numbers(value, f"{prefix}{key}.")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield f"{prefix}{key}", value
 
+
+def compare_benchmarks(baseline, current):
+    """Lines comparing every number the two result sets have in common."""
+    old = dict(_flatten_numbers(baseline.get('results', {})))
+    lines = []
+    for name, value in _flatten_numbers(current['results']):
+        if name in old:
+            change = f"{(value - old[name]) / old[name]:+.1%}" if old[name] else "n/a"
+            lines.append(f"{name}: {old[name]} -> {value} ({change})")
+    return lines
+
+
+def run_benchmarks(args):
+    """Runs the benchmark suite and writes the results as JSON. Returns the process exit code."""
+    import platform
+    suite = [('throughput', benchmark_throughput),
+             ('pacing', lambda: benchmark_pacing(args.benchmark_seconds)),
+             ('hotkey_to_first_key', lambda: benchmark_hotkey_latency(BENCHMARK_REPEATS)),
+             ('listener_restart', lambda: benchmark_listener_restart(5)),
+             ('tray_cycle', lambda: benchmark_tray_cycle(5)),
+             ('cold_start', lambda: benchmark_cold_start(3))]
+    results = {}
+    for name, benchmark in suite:
+        print(f"Running {name}...", file=sys.stderr)
+        results[name] = benchmark()
+    report = {'version': 1, 'created': time.time(), 'python': platform.python_version(),
+              'platform': platform.platform(), 'results': results}
+    output = json.dumps(report, indent=2)
+    if args.benchmark_output:
+        with open(args.benchmark_output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    if args.benchmark_compare:
         try:
-            # Attempt to load Arial font for better default appearance
-            ImageFont.truetype("arial.ttf", 10)
-            logging.info("Arial font check successful.")
-        except IOError:
-            logging.warning("Arial font not found during initial check, Pillow will use default.")
+            with open(args.benchmark_compare, encoding='utf-8') as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Cannot read baseline {args.benchmark_compare}: {e}", file=sys.stderr)
+            return 1
+        print("\n".join(compare_benchmarks(baseline, report)), file=sys.stderr)
+    return 0
+
+
+# --- Command Line ---
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="robokeybo",
+                                     description="RoboKeybo autotyper. Starts the GUI unless --no-gui or a text is given.")
+    parser.add_argument("--no-gui", action="store_true",
+                        help="Run headless; tkinter, pystray and PIL are never imported.")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="Start the GUI, print startup timings to stderr and exit.")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--text-file", help="File to type ('-' reads standard input).")
+    source.add_argument("--text", help="Text to type.")
+    source.add_argument("--snippet", metavar="NAME", help="Type a snippet from the snippet library.")
+    source.add_argument("--csv", metavar="FILE",
+                        help="Form fill: type each row of a CSV file as one record, in a single session.")
+    parser.add_argument("--encoding", default="utf-8", help="Encoding of --text-file (default: utf-8).")
+    parser.add_argument("--wpm", type=int,
+                        help=f"Typing speed (default: the snippet's own speed, else {DEFAULT_WPM}).")
+    parser.add_argument("--burst-size", type=int, default=1,
+                        help="Characters injected per batched call (default: 1, i.e. no bursts).")
+    parser.add_argument("--unthrottled", action="store_true", help="Type as fast as the target accepts.")
+    parser.add_argument("--countdown", type=int, default=COUNTDOWN_SECONDS,
+                        help=f"Seconds to wait before typing starts (default: {COUNTDOWN_SECONDS}).")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue from the last checkpoint of the same text instead of from the start.")
+    parser.add_argument("--transform", action="append", default=[], choices=list(TEXT_TRANSFORMS),
+                        help="Rewrite the text before typing; repeat to chain transforms in order. "
+                             "A --text-file is then read into memory instead of streamed.")
+    parser.add_argument("--editor", nargs="?", const="code", default="none", choices=list(EDITOR_TARGETS),
+                        help="Kind of editor typed into, which selects the transforms that match how it indents: "
+                             "keep-indent repeats the previous line's indentation; code also indents blocks and "
+                             "closes brackets (VS Code, JetBrains IDEs, Sublime Text). --editor alone means code.")
+    parser.add_argument("--backend", default=DEFAULT_KEYBOARD_BACKEND, choices=list(KEYBOARD_BACKENDS),
+                        help="How keys are sent: pynput (any platform), xtest (X11, batched) or recording "
+                             "(nothing is sent; events are recorded and summarized). "
+                             f"Default: {DEFAULT_KEYBOARD_BACKEND}.")
+    parser.add_argument("--process", action="store_true",
+                        help="Type from a separate process; a --text-file is then read into memory instead of streamed.")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Run the benchmark suite against a recording backend and print JSON results.")
+    parser.add_argument("--benchmark-output", help="Write the benchmark JSON to this file instead of stdout.")
+    parser.add_argument("--benchmark-compare", help="Benchmark JSON from an earlier run to compare against.")
+    parser.add_argument("--benchmark-seconds", type=float, default=2.0,
+                        help="Typing time per target rate in the pacing benchmark (default: 2).")
+    parser.add_argument("--metrics-port", type=int,
+                        help="Serve live session metrics as JSON on http://127.0.0.1:PORT/metrics (0 picks a free port).")
+    parser.add_argument("--log-level", type=str.upper, default=DEFAULT_LOG_LEVEL, choices=LOG_LEVELS,
+                        help=f"Log file verbosity (default: {DEFAULT_LOG_LEVEL}, or $ROBOKEYBO_LOG_LEVEL).")
+    parser.add_argument("--trace-keys", action="store_true", default=bool(os.environ.get('ROBOKEYBO_TRACE_KEYS')),
+                        help="Log every keystroke batch with its timing (also $ROBOKEYBO_TRACE_KEYS=1).")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="Record a timeline of the run and write it to FILE at exit, in Chrome trace format "
+                             "(open in ui.perfetto.dev or chrome://tracing).")
+    parser.add_argument("--field-key", default=DEFAULT_FIELD_KEY, choices=list(FORM_FILL_KEYS),
+                        help=f"Key pressed between the fields of a --csv record (default: {DEFAULT_FIELD_KEY}).")
+    parser.add_argument("--record-key", default=DEFAULT_RECORD_KEY, choices=list(FORM_FILL_KEYS),
+                        help=f"Key pressed after each --csv record (default: {DEFAULT_RECORD_KEY}).")
+    parser.add_argument("--record-delay", type=float, default=DEFAULT_RECORD_DELAY_S,
+                        help=f"Seconds to wait between --csv records (default: {DEFAULT_RECORD_DELAY_S}).")
+    parser.add_argument("--csv-header", action="store_true", help="The first --csv row holds column names; skip it.")
+    parser.add_argument("--csv-delimiter", default=",", help="Field delimiter of the --csv file (default: ',').")
+    parser.add_argument("--save-snippet", metavar="NAME",
+                        help="Store the --text or --text-file in the snippet library under NAME, then exit.")
+    parser.add_argument("--tags", default="", help="Space-separated tags for --save-snippet.")
+    parser.add_argument("--snippet-hotkey", help="Single-key hotkey that types the snippet saved by --save-snippet.")
+    parser.add_argument("--list-snippets", nargs="?", const="", metavar="TAG",
+                        help="List the snippet library (only snippets tagged TAG, if given), then exit.")
+    parser.add_argument("--tab-width", type=int, default=DEFAULT_TAB_WIDTH,
+                        help=f"Spaces per tab for the indentation transforms (default: {DEFAULT_TAB_WIDTH}).")
+    args = parser.parse_args(argv)
+    if args.wpm is not None and args.wpm <= 0:
+        parser.error("--wpm must be positive.")
+    if args.save_snippet is not None and (args.text_file is None and args.text is None or args.text_file == "-"):
+        parser.error("--save-snippet needs --text or a --text-file.")
+    if args.countdown < 0:
+        parser.error("--countdown must not be negative.")
+    if (args.no_gui and args.text is None and args.text_file is None and args.csv is None and args.snippet is None
+            and args.list_snippets is None):
+        parser.error("--no-gui needs --text, --text-file, --csv or --snippet.")
+    if args.csv is not None and (args.process or args.transform or args.editor != 'none'):
+        parser.error("--csv cannot be combined with --process, --transform or --editor.")
+    if not 0 <= args.record_delay <= MAX_RECORD_DELAY_S:
+        parser.error(f"--record-delay must be between 0 and {MAX_RECORD_DELAY_S}.")
+    if len(args.csv_delimiter) != 1:
+        parser.error("--csv-delimiter must be a single character.")
+    if args.tab_width <= 0:
+        parser.error("--tab-width must be positive.")
+    if args.metrics_port is not None and not 0 <= args.metrics_port <= 65535:
+        parser.error("--metrics-port must be between 0 and 65535.")
+    args.transforms = list(EDITOR_TARGETS[args.editor]) + args.transform
+    if args.wpm is None and args.snippet is None and args.save_snippet is None:
+        args.wpm = DEFAULT_WPM # A snippet's own speed is looked up when it is opened; none is stored unless given
+    return args
+
+
+def run_snippet_command(args):
+    """Handles --save-snippet and --list-snippets. Returns the process exit code."""
+    if args.save_snippet is not None and args.snippet_hotkey:
+        try:
+            parse_hotkey(args.snippet_hotkey.strip().lower())
+        except (ValueError, AttributeError):
+            print(f"--snippet-hotkey {args.snippet_hotkey} is not a single key on this system.", file=sys.stderr)
+            return 1
+        except ImportError as e: # No keyboard to check against, e.g. without a display; the GUI skips it if unusable
+            logging.warning(f"Could not check --snippet-hotkey {args.snippet_hotkey}: {e}")
+    try:
+        store = SnippetStore()
+    except Exception as e:
+        print(f"Cannot open the snippet library: {e}", file=sys.stderr)
+        return 1
+    try:
+        if args.save_snippet is not None:
+            if args.text is not None:
+                body = args.text
+            else:
+                with MappedTextSource(args.text_file, encoding=args.encoding) as source:
+                    body = source.read()
+            store.save(args.save_snippet, body, args.tags.split(), args.snippet_hotkey, args.wpm)
+            print(f"Saved snippet '{args.save_snippet}' ({len(body):,} characters) to {store.path}.", file=sys.stderr)
+        else:
+            for name in store.names(args.list_snippets or None):
+                snippet = store.index[name]
+                print(f"{name}\t{snippet.length} chars\thotkey={snippet.hotkey or '-'}\t"
+                      f"wpm={snippet.wpm or '-'}\ttags={' '.join(snippet.tags) or '-'}")
+    except (OSError, LookupError, ValueError) as e:
+        print(f"Snippet library: {e}", file=sys.stderr)
+        return 1
+    finally:
+        store.close()
+    return 0
+
+
+def run_headless(args):
+    """Types the requested text without a GUI. Returns the process exit code."""
+    def on_status(text, color):
+        print(text, file=sys.stderr)
 
-        app = AutoTypeApp(root)
+    if args.process:
+        engine = TypingProcess(on_status=on_status, backend=args.backend)
+    else:
+        engine = TypingEngine(backend=args.backend, on_status=on_status)
+    text_hash = None
+    plan = None
+    if args.text is not None:
+        source = args.text
+        text_hash = hash_text(source)
+    elif args.snippet is not None:
+        try:
+            store = SnippetStore()
+            try:
+                source, plan = store.load(args.snippet)
+                if args.wpm is None:
+                    args.wpm = store.index[args.snippet].wpm or DEFAULT_WPM
+            finally:
+                store.close()
+        except KeyError:
+            print(f"No snippet named '{args.snippet}'.", file=sys.stderr)
+            return 1
+        except Exception as e:
+            print(f"Cannot open the snippet library: {e}", file=sys.stderr)
+            return 1
+        text_hash = plan.text_hash
+    elif args.csv is not None:
+        field_key, record_key = FORM_FILL_KEYS[args.field_key], FORM_FILL_KEYS[args.record_key]
+        try:
+            text_hash = hash_csv_form(args.csv, field_key, record_key, args.csv_header, args.csv_delimiter)
+            source = CsvFormSource(args.csv, field_key, record_key, args.record_delay, args.csv_header,
+                                   args.csv_delimiter, args.encoding)
+            print(f"Form fill of {source.count_rows():,} records from {args.csv}.", file=sys.stderr)
+        except (OSError, LookupError, csv.Error) as e:
+            print(f"Cannot read {args.csv}: {e}", file=sys.stderr)
+            return 1
+    elif args.text_file == "-":
+        source = sys.stdin # Standard input cannot be checkpointed
+    else:
+        try:
+            text_hash = hash_file(args.text_file)
+            source = MappedTextSource(args.text_file, encoding=args.encoding)
+        except (OSError, LookupError) as e:
+            print(f"Cannot open {args.text_file}: {e}", file=sys.stderr)
+            return 1
+
+    if (args.transforms or args.process) and not isinstance(source, str):
+        text = source.read()
+        if source is not sys.stdin:
+            source.close()
+        source = text
+    if args.transforms:
+        plan = None
+        source, saved = preprocess_text(source, args.transforms, args.tab_width)
+        if text_hash is not None:
+            text_hash = hash_text(source)
+        print(f"Transforms saved {saved} keystrokes; {len(source)} left to type.", file=sys.stderr)
+
+    checkpoint = None
+    start_offset = 0
+    if text_hash is not None:
+        try:
+            path = SessionCheckpoint.default_path()
+            if isinstance(source, CsvFormSource):
+                checkpoint = RowCheckpoint(path, text_hash, source)
+            else:
+                checkpoint = SessionCheckpoint(path, text_hash, len(source) if isinstance(source, str) else None)
+            if args.resume:
+                start_offset = SessionCheckpoint.load_offset(path, text_hash)
+                print(f"Resuming at character {start_offset}.", file=sys.stderr)
+        except OSError as e:
+            print(f"Checkpoints disabled: {e}", file=sys.stderr)
+
+    result = {}
+    engine.on_finish = result.update
+    if isinstance(source, CsvFormSource):
+        rows_shown = [None]
+
+        def on_progress(position, total, elapsed):
+            rows = source.rows_done(position)
+            if rows != rows_shown[0]:
+                rows_shown[0] = rows
+                print(f"Record {rows:,} of {source.row_count:,} done.", file=sys.stderr)
+        engine.on_progress = on_progress
+    metrics_server = None
+    if args.metrics_port is not None:
+        try:
+            metrics_server = MetricsServer(lambda: {'running': engine.running, 'session': engine.live_metrics()},
+                                           args.metrics_port)
+            metrics_server.start()
+            print(f"Live metrics at http://127.0.0.1:{metrics_server.port}/metrics", file=sys.stderr)
+        except OSError as e:
+            print(f"Metrics endpoint disabled: {e}", file=sys.stderr)
+    try:
+        engine.start(source, args.wpm, burst_size=args.burst_size, unthrottled=args.unthrottled,
+                     countdown=args.countdown, start_offset=start_offset, checkpoint=checkpoint, plan=plan)
+        try:
+            while engine.running:
+                engine.join(0.2)
+        except KeyboardInterrupt:
+            engine.stop()
+            engine.join()
+    finally:
+        if source is not sys.stdin and not isinstance(source, str):
+            source.close()
+        engine.close()
+        if metrics_server is not None:
+            metrics_server.stop()
+
+    if result:
+        write_session_record(result)
+
+    if isinstance(engine.backend, RecordingBackend):
+        intervals = sorted(engine.backend.press_intervals())
+        if intervals:
+            print(f"Recorded {len(engine.backend.events)} key events; press interval median "
+                  f"{intervals[len(intervals) // 2] * 1000:.2f}ms, p99 {intervals[int(len(intervals) * 0.99)] * 1000:.2f}ms, "
+                  f"max {intervals[-1] * 1000:.2f}ms.", file=sys.stderr)
+    print(f"Typed {result.get('chars_typed', 0)} characters in {result.get('elapsed', 0.0):.2f}s "
+          f"({result.get('achieved_wpm', 0.0):.0f} WPM, target {args.wpm}), "
+          f"stopped at offset {result.get('position', start_offset)}.", file=sys.stderr)
+    if isinstance(source, CsvFormSource):
+        print(f"Filled {source.rows_done(result.get('position', start_offset)):,} of {source.row_count:,} records.",
+              file=sys.stderr)
+    if result.get('error'):
+        print(f"Typing failed: {result['error']}", file=sys.stderr)
+        return 1
+    return 130 if result.get('stopped') else 0
+
+
+def run_gui(startup_report_only=False, backend=DEFAULT_KEYBOARD_BACKEND, metrics_port=None):
+    load_gui_modules()
+    root = None
+    try:
+        root = tk.Tk()
+        root.withdraw() # Hide initial window to prevent flicker
+
+        app = AutoTypeApp(root, backend=backend, metrics_port=metrics_port)
 
         root.deiconify() # Show the main window after initialization
+        mark_startup("window shown")
+        if startup_report_only:
+            # Idle callbacks run in order, so this fires after the deferred initialization.
+            def report_and_exit():
+                print(f"Startup timing: {startup_report()}", file=sys.stderr)
+                app._perform_full_app_exit()
+            root.after_idle(report_and_exit)
         root.mainloop()
     except Exception as e:
         logging.critical(f"Fatal error before Tkinter mainloop: {e}")
         if root:
             # Ensure Tkinter root is destroyed even if an error occurs early
             root.destroy()
-        sys.exit(1)
+        return 1
+    return 0
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_logging(args.log_level, args.trace_keys)
+    logging.info("Application started.")
+    if args.trace:
+        start_tracing(args.trace)
+    if args.benchmark:
+        return run_benchmarks(args)
+    if args.save_snippet is not None or args.list_snippets is not None:
+        return run_snippet_command(args)
+    if (args.no_gui or args.text is not None or args.text_file is not None or args.csv is not None
+            or args.snippet is not None):
+        return run_headless(args)
+    return run_gui(startup_report_only=args.startup_report, backend=args.backend, metrics_port=args.metrics_port)
+
+
+mark_startup("module imported")
+
+
+# --- Main Application Execution ---
+if __name__ == "__main__":
+    if getattr(sys, 'frozen', False):
+        import multiprocessing
+        multiprocessing.freeze_support() # The typing process re-runs the bundled executable
+    sys.exit(main())
@@ -0,0 +1,72 @@
+import enum
+import os
+import sys
+import types
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import robokeybo
+
+
+class FakeKeyCode:
+    """Compares and hashes like pynput.keyboard.KeyCode (pynput 1.7)."""
+
+    def __init__(self, vk=None, char=None):
+        self.vk = vk
+        self.char = char
+
+    @classmethod
+    def from_char(cls, char):
+        return cls(char=char)
+
+    @classmethod
+    def from_vk(cls, vk):
+        return cls(vk=vk)
+
+    def __repr__(self):
+        return repr(self.char) if self.char is not None else f"<{self.vk}>"
+
+    def __eq__(self, other):
+        if not isinstance(other, FakeKeyCode):
+            return False
+        if self.char is not None and other.char is not None:
+            return self.char == other.char
+        return self.vk == other.vk
+
+    def __hash__(self):
+        return hash(repr(self))
+
+
+_KEY_NAMES = ('alt', 'alt_r', 'ctrl', 'ctrl_r', 'shift', 'shift_r', 'backspace', 'down', 'end', 'enter', 'esc',
+              'f8', 'home', 'space', 'tab')
+FakeKey = enum.Enum('FakeKey', {name: FakeKeyCode.from_vk(100 + i) for i, name in enumerate(_KEY_NAMES)})
+_NORMAL_MODIFIERS = {FakeKey.alt_r.value: FakeKey.alt, FakeKey.ctrl_r.value: FakeKey.ctrl,
+                     FakeKey.shift_r.value: FakeKey.shift}
+
+
+class FakeListener:
+    def canonical(self, key):
+        """pynput's Listener.canonical(): named keys other than modifiers become KeyCode.from_vk()."""
+        if isinstance(key, FakeKeyCode) and key.char is not None:
+            return FakeKeyCode.from_char(key.char.lower())
+        if isinstance(key, FakeKey) and key.value in _NORMAL_MODIFIERS:
+            return _NORMAL_MODIFIERS[key.value]
+        if isinstance(key, FakeKey) and key.value.vk is not None:
+            return FakeKeyCode.from_vk(key.value.vk)
+        return key
+
+
+@pytest.fixture
+def fake_pynput(monkeypatch):
+    """Stands in for pynput's key types, which cannot be imported without a desktop session."""
+    monkeypatch.setattr(robokeybo, 'Controller', object)
+    monkeypatch.setattr(robokeybo, 'Key', FakeKey)
+    monkeypatch.setattr(robokeybo, 'KeyCode', FakeKeyCode)
+    monkeypatch.setattr(robokeybo, 'keyboard', types.SimpleNamespace(Listener=FakeListener))
+    monkeypatch.setattr(robokeybo, 'CONTROL_CHAR_KEYS', {
+        '\n': FakeKey.enter, '\t': FakeKey.tab, robokeybo.KEY_DOWN_CHAR: FakeKey.down,
+        robokeybo.KEY_END_CHAR: FakeKey.end, robokeybo.KEY_BACKSPACE_CHAR: FakeKey.backspace,
+        robokeybo.KEY_SELECT_HOME_CHAR: FakeKey.home})
+    return types.SimpleNamespace(Key=FakeKey, KeyCode=FakeKeyCode, Listener=FakeListener)
@@ -0,0 +1,35 @@
+import ctypes.util
+import os
+
+import pytest
+
+from robokeybo import KEY_SELECT_HOME_CHAR, RecordingBackend, XTestBackend
+
+HAS_XTEST = bool(os.environ.get('DISPLAY') and ctypes.util.find_library('X11') and ctypes.util.find_library('Xtst'))
+
+
+def test_recording_backend_records_presses():
+    backend = RecordingBackend()
+    for char in backend.resolve("ab"):
+        backend.press(char)
+        backend.release(char)
+    backend.send_paste()
+    assert backend.typed_text() == "ab"
+    assert [kind for _, kind, _ in backend.events] == ['press', 'release', 'press', 'release', 'paste']
+
+
+@pytest.mark.skipif(not HAS_XTEST, reason="needs an X display with libX11 and libXtst")
+def test_xtest_backend_resolves_keys_against_the_keyboard_map():
+    backend = XTestBackend()
+    try:
+        lower, upper, enter, select_home, snowman = backend.resolve("aA\n" + KEY_SELECT_HOME_CHAR + "☃")
+        assert lower[0] and not lower[1]
+        assert upper[0] == lower[0] and upper[1] # Same key with Shift
+        assert enter[0] and enter[2] == 0xff0d
+        assert select_home[1] and select_home[2] == 0xff50 # Home with Shift held
+        if not snowman[0] and backend._scratch is not None:
+            assert backend._keycode(snowman) == backend._scratch # Bound to the spare keycode for the moment
+        backend.flush()
+    finally:
+        backend.close()
+    backend.close() # Closing twice is harmless
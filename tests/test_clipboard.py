@@ -0,0 +1,76 @@
+from robokeybo import (CLIPBOARD_MIN_SEGMENT, CLIPBOARD_SEGMENT, CLIPBOARD_TARGET_READ_S, RecordingBackend,
+                       TypingEngine, split_for_clipboard)
+
+
+class FakeClipboard:
+    """Holds the clipboard in memory; a target that reads each paste `read_s` after it is sent."""
+
+    def __init__(self, content="saved", read_s=0.0, tracks_reads=True):
+        self.content = content
+        self.read_s = read_s
+        self.tracks_reads = tracks_reads
+        self.writes = []
+
+    def read(self):
+        return self.content
+
+    def write(self, text):
+        self.content = text
+        self.writes.append(text)
+
+    def wait_read(self, since, timeout, stop_event):
+        return since + self.read_s if self.read_s is not None else None
+
+
+def paste(text, clipboard):
+    backend = RecordingBackend()
+    engine = TypingEngine(backend=backend, clipboard=clipboard)
+    summary = engine.run(text, 600, use_clipboard=True, unthrottled=True, countdown=0)
+    return backend, summary
+
+
+def test_split_types_short_runs_and_filtered_characters():
+    long_run = "x" * CLIPBOARD_MIN_SEGMENT
+    text = "ab\t" + long_run + "\t" + long_run[:-2] + "\n\n" # Newlines survive pastes
+    assert split_for_clipboard(text) == [('type', 0, 3), ('paste', 3, 3 + len(long_run)),
+                                         ('type', 3 + len(long_run), 4 + len(long_run)),
+                                         ('paste', 4 + len(long_run), len(text))]
+    assert split_for_clipboard("short\ttext") == [('type', 0, 10)]
+    assert split_for_clipboard("") == []
+
+
+def test_pastes_grow_while_the_target_reads_them_quickly():
+    text = "y" * (CLIPBOARD_SEGMENT * 7)
+    clipboard = FakeClipboard(read_s=0.001)
+    backend, summary = paste(text, clipboard)
+    assert [len(segment) for segment in clipboard.writes[:-1]] == [CLIPBOARD_SEGMENT, CLIPBOARD_SEGMENT * 2,
+                                                                     CLIPBOARD_SEGMENT * 4]
+    assert "".join(clipboard.writes[:-1]) == text
+    assert clipboard.content == "saved" # Restored
+    assert summary['position'] == len(text) and not summary['stopped']
+
+
+def test_pastes_shrink_when_the_target_reads_them_slowly():
+    text = "y" * (CLIPBOARD_SEGMENT * 2)
+    clipboard = FakeClipboard(read_s=CLIPBOARD_TARGET_READ_S * 2)
+    paste(text, clipboard)
+    sizes = [len(segment) for segment in clipboard.writes[:-1]]
+    assert sizes[:3] == [CLIPBOARD_SEGMENT, CLIPBOARD_SEGMENT // 2, CLIPBOARD_SEGMENT // 4]
+    assert sum(sizes) == len(text)
+
+
+def test_a_paste_the_target_never_reads_stops_before_it():
+    text = "ab\t" + "z" * CLIPBOARD_SEGMENT
+    clipboard = FakeClipboard(read_s=None)
+    backend, summary = paste(text, clipboard)
+    assert summary['error'] and summary['position'] == 3 # Resume pastes the lost segment again
+    assert backend.typed_text() == "ab\t"
+    assert clipboard.content == "saved"
+
+
+def test_untracked_clipboards_paste_fixed_segments():
+    text = "w" * (CLIPBOARD_SEGMENT + 10)
+    clipboard = FakeClipboard(tracks_reads=False)
+    backend, summary = paste(text, clipboard)
+    assert [len(segment) for segment in clipboard.writes[:-1]] == [CLIPBOARD_SEGMENT, 10]
+    assert [kind for _, kind, _ in backend.events] == ['paste', 'paste']
@@ -0,0 +1,101 @@
+import time
+
+import robokeybo
+from robokeybo import (MAX_LAG_S, CsvFormSource, KeystrokePacer, RecordingBackend, RowCheckpoint, SessionCheckpoint,
+                       TypingEngine, hash_csv_form)
+
+
+class StoppingBackend(RecordingBackend):
+    """Asks the engine to stop once `limit` keys have been pressed."""
+
+    def __init__(self, limit):
+        super().__init__()
+        self.limit = limit
+        self.engine = None
+
+    def press(self, char):
+        super().press(char)
+        if len(self.typed_text()) == self.limit:
+            self.engine.stop()
+
+
+def run_until(source, limit, **options):
+    backend = StoppingBackend(limit)
+    engine = backend.engine = TypingEngine(backend=backend)
+    summary = engine.run(source, 600, unthrottled=True, countdown=0, **options)
+    return backend, summary
+
+
+# --- Pacing ---
+def test_pacer_absorbs_injection_time_instead_of_drifting():
+    pacer = KeystrokePacer(6000) # 500 characters/s, 2ms apart
+    pacer.start()
+    for _ in range(50):
+        time.sleep(0.001) # Time spent injecting each key
+        pacer.pace()
+    assert 0.098 <= pacer.elapsed() < 0.13 # 50 intervals, not 50 intervals plus 50 injections
+
+
+def test_pacer_rebases_after_a_long_stall():
+    pacer = KeystrokePacer(120)
+    pacer.start()
+    pacer.next_deadline -= MAX_LAG_S + 1 # The target stalled
+    before = time.perf_counter()
+    assert not pacer.pace()
+    assert pacer.rebases == 1
+    assert before <= pacer.next_deadline <= time.perf_counter() # Restarted from now, no catch-up burst
+
+
+def test_pacer_wait_false_only_schedules():
+    pacer = KeystrokePacer(600) # 50 characters/s
+    pacer.start()
+    start = time.perf_counter()
+    pacer.pace(5, wait=False)
+    assert time.perf_counter() - start < 0.05
+    pacer.wait()
+    assert time.perf_counter() - start >= 0.1
+
+
+def test_burst_session_ends_with_its_last_key():
+    backend = RecordingBackend()
+    summary = TypingEngine(backend=backend).run("x" * 8, 120, burst_size=4, countdown=0) # 10 characters/s
+    returned = time.perf_counter()
+    assert backend.typed_text() == "x" * 8
+    assert returned - backend.events[-1][0] < 0.2 # Not another 0.4s burst interval
+    assert 100 < summary['achieved_wpm'] <= 125
+
+
+# --- Pause and resume ---
+def test_stop_and_resume_types_every_character_once():
+    text = "The quick brown fox\njumps over the lazy dog."
+    backend, summary = run_until(text, 10)
+    assert summary['stopped'] and summary['position'] == 10
+    resumed = RecordingBackend()
+    summary = TypingEngine(backend=resumed).run(text, 600, unthrottled=True, countdown=0,
+                                                start_offset=summary['position'])
+    assert not summary['stopped'] and summary['position'] == len(text)
+    assert backend.typed_text() + resumed.typed_text() == text
+
+
+def test_stop_checkpoints_the_position(tmp_path):
+    text = "x" * 50
+    path = str(tmp_path / "checkpoint.json")
+    checkpoint = SessionCheckpoint(path, robokeybo.hash_text(text), len(text))
+    run_until(text, 20, checkpoint=checkpoint)
+    assert SessionCheckpoint.load_offset(path, robokeybo.hash_text(text)) == 20
+
+
+def test_row_checkpoint_resumes_at_the_interrupted_record(tmp_path):
+    path = tmp_path / "form.csv"
+    path.write_text("a,b\ncc,dd\neee,fff\n", encoding='utf-8')
+    path = str(path)
+    checkpoint_path = str(tmp_path / "checkpoint.json")
+    text_hash = hash_csv_form(path, '\t', '\n', False)
+    with CsvFormSource(path) as source:
+        run_until(source, 7, checkpoint=RowCheckpoint(checkpoint_path, text_hash, source)) # Inside "cc\tdd\n"
+    offset = SessionCheckpoint.load_offset(checkpoint_path, text_hash)
+    assert offset == len("a\tb\n")
+    with CsvFormSource(path) as source:
+        backend = RecordingBackend()
+        TypingEngine(backend=backend).run(source, 600, unthrottled=True, countdown=0, start_offset=offset)
+    assert backend.typed_text() == "cc\tdd\neee\tfff\n"
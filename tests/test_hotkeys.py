@@ -0,0 +1,56 @@
+import pytest
+
+import robokeybo
+from robokeybo import HotkeyDispatcher, SyntheticEventFilter, key_identity, parse_args, run_snippet_command
+
+
+def test_dispatcher_fires_named_and_character_hotkeys(fake_pynput):
+    Key, KeyCode = fake_pynput.Key, fake_pynput.KeyCode
+    fired = []
+    dispatcher = HotkeyDispatcher()
+    dispatcher.listener = fake_pynput.Listener()
+    dispatcher.set_bindings({hotkey: (lambda hotkey=hotkey: fired.append(hotkey)) for hotkey in ('f8', 'z', 'enter')})
+    for key in (Key.f8, KeyCode.from_char('z'), KeyCode.from_char('Z'), Key.enter, Key.space):
+        dispatcher._dispatch(key)
+    assert fired == ['f8', 'z', 'z', 'enter']
+
+
+def test_injected_control_characters_are_not_hotkey_presses(fake_pynput):
+    fired = []
+    synthetic_filter = SyntheticEventFilter()
+    synthetic_filter.tags_injected = False # The echo-matching path used outside Windows
+    dispatcher = HotkeyDispatcher(synthetic_filter)
+    dispatcher.listener = fake_pynput.Listener()
+    dispatcher.set_bindings({'enter': lambda: fired.append('enter'), 'space': lambda: fired.append('space')})
+    assert synthetic_filter.watches('\n') and synthetic_filter.watches(' ')
+    assert not synthetic_filter.watches('\t')
+    synthetic_filter.note_injected('\n')
+    dispatcher._dispatch(fake_pynput.Key.enter) # The echo of the typed newline
+    dispatcher._dispatch(fake_pynput.Key.enter) # A physical press
+    assert fired == ['enter']
+
+
+def test_unparsable_snippet_hotkeys_are_skipped(fake_pynput):
+    fired = []
+    dispatcher = HotkeyDispatcher()
+    dispatcher.listener = fake_pynput.Listener()
+    dispatcher.set_bindings({'insert': lambda: fired.append('insert'), 'z': lambda: fired.append('z')},
+                            required=('z',)) # The fake keyboard, like macOS, has no insert key
+    dispatcher._dispatch(fake_pynput.KeyCode.from_char('z'))
+    assert fired == ['z']
+    with pytest.raises(AttributeError):
+        dispatcher.set_bindings({'insert': lambda: None}, required=('insert',))
+    dispatcher._dispatch(fake_pynput.KeyCode.from_char('z'))
+    assert fired == ['z', 'z'] # The old table stays active
+
+
+def test_save_snippet_rejects_a_hotkey_that_is_not_a_key(fake_pynput, capsys):
+    args = parse_args(["--save-snippet", "s", "--text", "x", "--snippet-hotkey", "insert"])
+    assert run_snippet_command(args) == 1
+    assert "not a single key" in capsys.readouterr().err
+
+
+def test_key_identity_works_before_pynput_is_loaded(monkeypatch):
+    monkeypatch.setattr(robokeybo, 'Key', None)
+    monkeypatch.setattr(robokeybo, 'CONTROL_CHAR_KEYS', {})
+    assert key_identity(' ') == ' ' and key_identity('A') == 'a'
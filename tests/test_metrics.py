@@ -0,0 +1,24 @@
+from robokeybo import INJECTION_LATENCY_BUCKETS_US, RecordingBackend, SessionMetrics, TypingEngine
+
+
+def test_snapshot_buckets_latencies_and_counts_positions():
+    metrics = SessionMetrics(120, start_offset=5, total_chars=50)
+    metrics.record_batch(1, 40e-6, 0.0)
+    metrics.record_batch(4, 300e-6, 0.02)
+    metrics.record_batch(1, 1.0, 0.01) # Slower than the last bucket
+    metrics.position = 11
+    snapshot = metrics.snapshot()
+    assert snapshot['target_cps'] == 10.0
+    assert snapshot['chars_typed'] == 6 and snapshot['chars_skipped'] == 5 and snapshot['chars_remaining'] == 39
+    assert snapshot['batches'] == 3 and snapshot['longest_stall_ms'] == 20.0
+    counts = snapshot['injection_latency_us']['counts']
+    assert len(counts) == len(INJECTION_LATENCY_BUCKETS_US) + 1
+    assert counts[0] == 1 and counts[INJECTION_LATENCY_BUCKETS_US.index(500)] == 1 and counts[-1] == 1
+
+
+def test_burst_session_rate_matches_the_target():
+    summary = TypingEngine(backend=RecordingBackend()).run("x" * 16, 120, burst_size=8, countdown=0) # 10 characters/s
+    metrics = summary['metrics']
+    assert metrics['chars_typed'] == 16
+    assert 8.0 < metrics['achieved_cps'] <= 10.5 # Not 16 characters over the 0.8s up to the last burst
+    assert abs(metrics['achieved_cps'] * 12 - summary['achieved_wpm']) < 1
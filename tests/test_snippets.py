@@ -0,0 +1,74 @@
+import sqlite3
+
+import pytest
+
+from robokeybo import SnippetStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SnippetStore(str(tmp_path / "snippets.db"), cache_entries=2, cache_chars=10)
+    yield store
+    store.close()
+
+
+def test_saved_snippets_are_indexed_by_name_and_tag(store):
+    store.save("greeting", "Hello", ["mail", "short"], hotkey="F9", wpm=80)
+    store.save("sig", "Regards", ["mail"])
+    assert store.names() == ["greeting", "sig"]
+    assert store.names("short") == ["greeting"]
+    assert store.tags() == ["mail", "short"]
+    assert store.index["greeting"].hotkey == "f9" and store.index["greeting"].wpm == 80
+    with pytest.raises(ValueError):
+        store.save("other", "x", hotkey="f9") # Taken by greeting
+    body, plan = store.load("sig")
+    assert body == "Regards" and plan.char_count == 7
+    store.delete("sig")
+    assert store.names("mail") == ["greeting"]
+    with pytest.raises(KeyError):
+        store.load("sig")
+
+
+def test_cache_evicts_least_recently_used_by_entries(store):
+    for name in "abc":
+        store.save(name, name * 2)
+    store.load("a")
+    store.load("b")
+    store.load("a") # b is now the least recently used
+    store.load("c")
+    assert list(store._cache) == ["a", "c"]
+
+
+def test_cache_evicts_by_characters_but_keeps_the_newest(store):
+    store.save("small", "x" * 4)
+    store.save("medium", "y" * 7)
+    store.save("huge", "z" * 50)
+    store.load("small")
+    store.load("medium") # 11 characters > 10
+    assert list(store._cache) == ["medium"]
+    store.load("huge")
+    assert list(store._cache) == ["huge"] and store._cached_chars == 50
+
+
+def test_opening_reads_only_the_index(tmp_path, monkeypatch):
+    path = str(tmp_path / "snippets.db")
+    writer = SnippetStore(path)
+    writer.save("big", "b" * 1000, ["t"])
+    writer.close()
+    statements = []
+    connect = sqlite3.connect
+
+    def traced_connect(*args, **kwargs):
+        db = connect(*args, **kwargs)
+        db.set_trace_callback(statements.append)
+        return db
+
+    monkeypatch.setattr(sqlite3, 'connect', traced_connect)
+    reader = SnippetStore(path)
+    try:
+        assert reader.index["big"].length == 1000 and reader.index["big"].tags == ("t",)
+        assert not any(statement.startswith("SELECT") and "body" in statement for statement in statements)
+        assert reader.load("big")[0] == "b" * 1000
+        assert any(statement.startswith("SELECT body") for statement in statements)
+    finally:
+        reader.close()
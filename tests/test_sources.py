@@ -0,0 +1,81 @@
+from robokeybo import PREVIEW_MAX_LINE_CHARS, CsvFormSource, MappedTextSource, TextDocument
+
+
+def write_crlf_file(tmp_path):
+    raw = "héllo\r\nwörld\r\n\r\nx\ry\n" * 5
+    path = tmp_path / "crlf.txt"
+    path.write_bytes(raw.encode('utf-8'))
+    return raw, str(path)
+
+
+def test_mapped_text_source_normalizes_line_endings_across_windows(tmp_path):
+    raw, path = write_crlf_file(tmp_path)
+    with MappedTextSource(path, window_bytes=7) as source:
+        text = ''.join(iter(lambda: source.read(9), ''))
+    assert text == raw.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def test_byte_position_is_exact_on_crlf_files(tmp_path):
+    raw, path = write_crlf_file(tmp_path)
+    # Byte offset of every normalized character
+    expected, offset, i = [], 0, 0
+    while i < len(raw):
+        expected.append(offset)
+        step = 2 if raw.startswith('\r\n', i) else 1
+        offset += len(raw[i:i + step].encode('utf-8'))
+        i += step
+    with MappedTextSource(path, window_bytes=16) as source:
+        while True:
+            block_start = source.chars_read
+            block = source.read(11)
+            if not block:
+                break
+            for position in range(block_start, block_start + len(block)):
+                assert source.byte_position(position) == expected[position]
+
+
+def test_mapped_text_source_reads_empty_files(tmp_path):
+    path = tmp_path / "empty.txt"
+    path.write_bytes(b'')
+    with MappedTextSource(str(path)) as source:
+        assert source.read(10) == ''
+        assert source.byte_position(0) == 0
+
+
+def test_text_document_windows_of_lines():
+    document = TextDocument("\r\n" + "\r\n".join(f"line {i}" for i in range(10)) + "\r\n\r\n")
+    assert document.text.startswith("line 0\nline 1") and document.text.endswith("line 9")
+    assert document.line_count == 10
+    assert document.lines(0, 2) == "line 0\nline 1"
+    assert document.lines(8, 5) == "line 8\nline 9" # Cut at the end
+    assert document.lines(-3, 1) == "line 0"
+    assert document.plan.char_count == len(document.text)
+
+
+def test_text_document_cuts_long_lines_for_display_only():
+    long_line = "x" * (PREVIEW_MAX_LINE_CHARS + 10)
+    document = TextDocument(f"short\n{long_line}")
+    assert document.lines(1, 1) == "x" * PREVIEW_MAX_LINE_CHARS + " \u2026"
+    assert long_line in document.text
+
+
+def write_csv(tmp_path, text):
+    path = tmp_path / "form.csv"
+    path.write_text(text, encoding='utf-8', newline='')
+    return str(path)
+
+
+def test_csv_form_source_types_records_with_form_keys(tmp_path):
+    path = write_csv(tmp_path, 'name,city\r\nAda,London\r\n\r\n"Bob, Jr.","New\r\nYork"\r\n')
+    with CsvFormSource(path, field_key='\t', record_key='\n', record_delay=0.5, skip_header=True) as source:
+        assert source.count_rows() == 2
+        assert source.read(100) == "Ada\tLondon\n"
+        assert source.pause_after_block() == 0.5
+        assert source.read(100) == "Bob, Jr.\tNew\nYork\n"
+        assert source.pause_after_block() == 0.0 # No delay after the last record
+        assert source.read(100) == ''
+
+
+def test_csv_count_rows_of_empty_file_is_zero(tmp_path):
+    with CsvFormSource(write_csv(tmp_path, ''), skip_header=True) as source:
+        assert source.count_rows() == 0
@@ -0,0 +1,38 @@
+import json
+import threading
+
+import robokeybo
+from robokeybo import RecordingBackend, TimelineTracer, TypingEngine
+
+
+def test_write_produces_a_chrome_trace(tmp_path):
+    tracer = TimelineTracer()
+    tracer.complete("batch", "typing", 1.0, 1.0005, (('chars', 4),))
+    tracer.instant("tray shown", "tray", {'visible': True})
+    child = TimelineTracer()
+    child.pid = tracer.pid + 1 # Stands in for the typing process
+    child.complete("paste", "typing", 2.0, 2.25)
+    tracer.merge(*child.drain())
+    path = tmp_path / "trace.json"
+    tracer.write(str(path))
+
+    trace = json.loads(path.read_text(encoding='utf-8'))
+    assert trace['displayTimeUnit'] == 'ms'
+    events = trace['traceEvents']
+    processes = {event['args']['name'] for event in events if event['name'] == 'process_name'}
+    assert processes == {"RoboKeybo", "RoboKeybo typing"}
+    threads = {event['tid'] for event in events if event['name'] == 'thread_name'}
+    assert threading.get_native_id() in threads
+    spans = {event['name']: event for event in events if event['ph'] != 'M'}
+    assert spans['batch']['ph'] == 'X' and spans['batch']['ts'] == 1e6 and spans['batch']['dur'] == 500.0
+    assert spans['batch']['args'] == {'chars': 4} and spans['batch']['tid'] in threads
+    assert spans['tray shown']['ph'] == 'i' and 'dur' not in spans['tray shown']
+    assert spans['paste']['pid'] == child.pid and spans['paste']['dur'] == 250000.0
+
+
+def test_a_traced_session_records_its_spans(monkeypatch):
+    tracer = TimelineTracer()
+    monkeypatch.setattr(robokeybo, 'tracer', tracer)
+    TypingEngine(backend=RecordingBackend()).run("abc", 600, unthrottled=True, countdown=0)
+    names = {event[2] for event in tracer.events}
+    assert {"countdown", "session"} <= names
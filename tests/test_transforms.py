@@ -0,0 +1,61 @@
+from robokeybo import (BLOCK_OPENERS, DEDENT_KEYS, EDITOR_TARGETS, KEY_BACKSPACE_CHAR, KEY_DOWN_CHAR, KEY_END_CHAR,
+                       KEY_SELECT_HOME_CHAR, keep_auto_indent, preprocess_text, skip_auto_closed_pairs,
+                       smart_auto_indent)
+
+PYTHON = "def f(x):\n    if x:\n        a()\n\n    b()\nc()"
+
+
+def simulate_auto_indent(keys, smart=False, tab_width=4):
+    """Applies keystrokes to an editor that starts each new line with the previous line's
+    indentation, plus one level after a block opener when `smart`."""
+    lines = ['']
+    selected = False # Shift+Home selected the line up to the cursor
+    for key in keys:
+        if key == KEY_SELECT_HOME_CHAR:
+            selected = True
+            continue
+        if key == '\n':
+            body = lines[-1].lstrip(' \t')
+            indent = lines[-1][:len(lines[-1]) - len(body)]
+            if smart and body.rstrip().endswith(BLOCK_OPENERS):
+                indent += ' ' * tab_width
+            lines.append(indent)
+        elif key == KEY_BACKSPACE_CHAR:
+            lines[-1] = '' if selected else lines[-1][:-1]
+        else:
+            lines[-1] += key
+        selected = False
+    return '\n'.join(line if line.strip() else '' for line in lines)
+
+
+def test_keep_indent_types_only_the_missing_indentation():
+    keys = keep_auto_indent(PYTHON)
+    assert keys == f"def f(x):\n    if x:\n    a()\n\n{DEDENT_KEYS}    b()\n{DEDENT_KEYS}c()"
+    assert simulate_auto_indent(keys) == PYTHON
+
+
+def test_smart_indent_expects_a_level_after_block_openers():
+    keys = smart_auto_indent(PYTHON)
+    assert keys == f"def f(x):\nif x:\na()\n\n{DEDENT_KEYS}    b()\n{DEDENT_KEYS}c()"
+    assert simulate_auto_indent(keys, smart=True) == PYTHON
+    assert simulate_auto_indent(keep_auto_indent(PYTHON), smart=True) != PYTHON # The models are not interchangeable
+
+
+def test_dedent_is_one_backspace_whatever_the_depth():
+    text = "a:\n" + "".join(" " * (4 * depth) + f"l{depth}:\n" for depth in range(1, 6)) + "z"
+    keys = smart_auto_indent(text)
+    assert keys.count(KEY_BACKSPACE_CHAR) == 1
+    assert simulate_auto_indent(keys, smart=True) == text
+
+
+def test_skip_auto_closed_pairs_steps_over_inserted_closers():
+    assert skip_auto_closed_pairs("f(a, g(b))") == f"f(a, g(b{KEY_END_CHAR}"
+    assert skip_auto_closed_pairs("x = '(';") == "x = '(';"
+
+
+def test_code_target_chains_smart_indent_and_skip_pairs():
+    text = "if (a) {\n    b();\n}\nc();"
+    keys, saved = preprocess_text(text, EDITOR_TARGETS['code'])
+    assert keys == f"if (a) {{\nb();{KEY_DOWN_CHAR}{KEY_END_CHAR}\nc();" # Down and End step over the inserted }
+    assert saved == len(text) - len(keys)
+    assert EDITOR_TARGETS['none'] == ()